@@ -0,0 +1,82 @@
+"""Compare parse time and memory of the string models for a large project
+
+Usage: python benchmarks/bench_models.py [count]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from common.models import String, StringRecord  # noqa: E402
+
+RUNS = 3
+
+
+def payload(idx: int) -> dict:
+    return {
+        "id": idx,
+        "projectId": 1,
+        "fileId": idx // 500,
+        "branchId": 1,
+        "directoryId": 1,
+        "identifier": f"cogs/example/main.py:{idx}",
+        "text": f"Hello {{}}, this is string number {idx}!",
+        "type": "text",
+        "context": f"cogs/example/main.py:{idx}",
+        "maxLength": 0,
+        "isHidden": False,
+        "isDuplicate": False,
+        "masterStringId": None,
+        "revision": 1,
+        "hasPlurals": False,
+        "isIcu": False,
+        "labelIds": [],
+        "createdAt": "2023-07-01T12:34:56+00:00",
+        "updatedAt": "2023-07-02T12:34:56+00:00",
+    }
+
+
+def bench(name: str, parse, data: list):
+    # Time and memory are measured in separate passes, tracemalloc slows down allocations a lot
+    elapsed = min(timed(parse, data) for _ in range(RUNS))
+    tracemalloc.start()
+    records = [parse(i) for i in data]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    print(f"{name:<22} {elapsed:>8.3f}s {size / 1024 / 1024:>10.1f}MB")
+
+
+def timed(parse, data: list) -> float:
+    # Like timeit, keep the garbage collector out of the timing
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        records = [parse(i) for i in data]
+        elapsed = time.perf_counter() - start
+    finally:
+        gc.enable()
+    # Freed after the clock stops
+    del records
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    data = [payload(i) for i in range(count)]
+    print(f"Parsing {count} strings")
+    print(f"{'':<22} {'time':>9} {'memory':>12}")
+    # pydantic 2 deprecates the v1 names, and the warning on every call would skew the timings
+    validate = getattr(String, "model_validate", String.parse_obj)
+    construct = getattr(String, "model_construct", String.construct)
+    bench("String (validated)", validate, data)
+    bench("String (constructed)", lambda i: construct(**i), data)
+    bench("StringRecord", StringRecord, data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Measure import time of each mode's entry path with `python -X importtime`
+
+Usage: python benchmarks/bench_startup.py [git ref to compare against, ex: HEAD~1]
+"""
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+# The modules main.py ends up importing for each mode
+PATHS = {
+    "main": "main",
+    "translate/QA": "main, common.processing",
+    "watch": "main, common.daemon",
+    "estimate": "main, common.estimate",
+}
+RUNS = 10
+
+
+def import_time(modules: str, cwd: Path) -> tuple:
+    """Return the total import time in ms and the slowest top level imports of an entry path"""
+    res = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modules}"],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+    )
+    if res.returncode:
+        raise RuntimeError(res.stderr.strip().splitlines()[-1])
+    total = 0
+    slowest = []
+    for line in res.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Top level imports aren't indented, nested ones are counted in their parent
+        if not name.startswith("  "):
+            total += int(cumulative)
+            slowest.append((int(cumulative), name.strip()))
+    slowest.sort(reverse=True)
+    return total / 1000, slowest[:5]
+
+
+def bench(cwd: Path, label: str):
+    print(f"\n{label}")
+    for name, modules in PATHS.items():
+        try:
+            # Best of several runs to cut out noise from the disk cache
+            runs = [import_time(modules, cwd) for _ in range(RUNS)]
+        except RuntimeError as e:
+            print(f"  {name:<14} failed: {e}")
+            continue
+        total, slowest = min(runs, key=lambda i: i[0])
+        top = ", ".join(f"{module} {round(us / 1000, 1)}ms" for us, module in slowest[:3])
+        print(f"  {name:<14} {total:>8.1f}ms  ({top})")
+
+
+def main():
+    bench(ROOT, "Working tree")
+    if len(sys.argv) < 2:
+        return
+    ref = sys.argv[1]
+    with tempfile.TemporaryDirectory() as tmp:
+        worktree = Path(tmp) / "ref"
+        subprocess.run(["git", "worktree", "add", "--detach", str(worktree), ref], cwd=ROOT, check=True)
+        try:
+            # Use the same .env so both trees run in the same mode
+            if (ROOT / ".env").exists():
+                (worktree / ".env").write_text((ROOT / ".env").read_text())
+            bench(worktree, ref)
+        finally:
+            subprocess.run(["git", "worktree", "remove", "--force", str(worktree)], cwd=ROOT)
+
+
+if __name__ == "__main__":
+    main()
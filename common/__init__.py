@@ -1,3 +1,4 @@
+import functools
 import json
 import os
 from pathlib import Path
@@ -13,35 +14,69 @@ ENDPOINT_OVERRIDE = os.environ.get("ENDPOINT_OVERRIDE")
 AUTO = int(os.environ.get("AUTO", 0))
 PRE_TRANSLATE = int(os.environ.get("PRE_TRANSLATE", 0))
 PROCESS_QA = int(os.environ.get("PROCESS_QA", 0))
+STREAM = int(os.environ.get("STREAM", 0))
+BATCH = int(os.environ.get("BATCH", 0))
+BATCH_TOKENS = int(os.environ.get("BATCH_TOKENS", 800))
+BATCH_SIZE = int(os.environ.get("BATCH_SIZE", 20))
+GLOSSARY = int(os.environ.get("GLOSSARY", 0))
+ESTIMATE = int(os.environ.get("ESTIMATE", 0))
+WATCH = int(os.environ.get("WATCH", 0))
+POLL_INTERVAL = int(os.environ.get("POLL_INTERVAL", 300))
+WEBHOOK_HOST = os.environ.get("WEBHOOK_HOST", "127.0.0.1")
+WEBHOOK_PORT = int(os.environ.get("WEBHOOK_PORT", 0))
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET", "")
+WORKERS = int(os.environ.get("WORKERS", 1))
+SHARD_COUNT = int(os.environ.get("SHARD_COUNT", 1))
+SHARD_INDEX = int(os.environ.get("SHARD_INDEX") or -1)
+CACHE_SIZE = int(os.environ.get("CACHE_SIZE", 1024))
+CACHE_DISK = int(os.environ.get("CACHE_DISK", 1))
+CACHE_DISK_MB = int(os.environ.get("CACHE_DISK_MB", 256))
 DEEPL_KEY = os.environ.get("DEEPL_KEY")
 CROWDIN_KEY = os.environ.get("CROWDIN_KEY")
+CROWDIN_CONCURRENCY = int(os.environ.get("CROWDIN_CONCURRENCY", 20))
 
 # Init data paths
 root_dir = Path(__file__).parent.parent
 system_prompt_path = root_dir / "system_prompt"
+batch_prompt_path = root_dir / "batch_prompt"
 correction_prompt_dir = root_dir / "correction_prompts"
 qa_prompt_dir = root_dir / "qa_prompts"
+glossary_path = Path(os.environ["GLOSSARY_PATH"]) if os.environ.get("GLOSSARY_PATH") else None
 
-data_dir = root_dir / "data"
+data_dir = Path(os.environ.get("DATA_DIR") or root_dir / "data")
+coordination_db = Path(os.environ.get("COORDINATION_DB") or data_dir / "coordination.sqlite3")
 messages_dir = data_dir / "messages"
 revisions_dir = data_dir / "revisions"
+cache_dir = data_dir / "cache"
+checkpoint_dir = data_dir / "checkpoint"
 tokens_json = data_dir / "tokens.json"
+# Per string and per call metrics of past translation runs, used by the estimator
+history_json = data_dir / "history.json"
 processed_json = data_dir / "processed.json"
 processed_qa_json = data_dir / "processed_qa.json"
 
-# Create folders if they dont exist
-data_dir.mkdir(exist_ok=True)
-messages_dir.mkdir(exist_ok=True)
-revisions_dir.mkdir(exist_ok=True)
-# Create data files if they dont exist
-if not tokens_json.exists():
-    tokens_json.write_text(json.dumps({"total": 0, "prompt": 0, "completion": 0}))
-if not processed_json.exists():
-    processed_json.write_text("[]")
-if not processed_qa_json.exists():
-    processed_qa_json.write_text("[]")
-
-
-LENGTH_DIFFERENCE = (correction_prompt_dir / "length_difference").read_text()
-PLACEHOLDER_MISMATCH = (correction_prompt_dir / "placeholder_mismatch").read_text()
-BACKTICK_MISMATCH = (correction_prompt_dir / "backtick_mismatch").read_text()
+
+def init_data():
+    """Create the data folders and files, called by the entry points rather than on import"""
+    # Create folders if they dont exist
+    data_dir.mkdir(parents=True, exist_ok=True)
+    messages_dir.mkdir(exist_ok=True)
+    revisions_dir.mkdir(exist_ok=True)
+    # Create data files if they dont exist
+    if not tokens_json.exists():
+        tokens_json.write_text(json.dumps({"total": 0, "prompt": 0, "completion": 0}))
+    if not history_json.exists():
+        keys = ("strings", "source", "calls", "completion", "timed_completion", "seconds", "crowdin_seconds")
+        stats = dict.fromkeys(keys, 0)
+        history_json.write_text(json.dumps(stats))
+    if not processed_json.exists():
+        processed_json.write_text("[]")
+    if not processed_qa_json.exists():
+        processed_qa_json.write_text("[]")
+
+
+@functools.lru_cache(maxsize=None)
+def load_prompt(path: Path) -> str:
+    """Read a prompt file once, on first use"""
+    return path.read_text()
+
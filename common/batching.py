@@ -0,0 +1,45 @@
+import typing as t
+
+from common.jobs import Job
+from common.tokenizer import count_tokens
+
+
+def batchable(job: Job) -> bool:
+    """ICU strings and strings with plurals are translated alone, so the single string checks
+    and correction prompts apply to their syntax
+    """
+    string = job.string
+    return isinstance(string.text, str) and not string.hasPlurals and not string.isIcu
+
+
+def group_jobs(
+    jobs: t.List[Job], max_tokens: int, max_size: int
+) -> t.List[t.Union[Job, t.List[Job]]]:
+    """Group related strings so they're translated together in one conversation
+
+    Strings are grouped by project, language and file, kept in file order so neighbouring
+    strings share context, and split so each group's source text fits the token budget.
+    """
+    groups: t.Dict[tuple, t.List[Job]] = {}
+    items: t.List[t.Union[Job, t.List[Job]]] = []
+    for job in jobs:
+        if not batchable(job):
+            items.append(job)
+            continue
+        key = (job.project.id, job.language.id, job.string.fileId)
+        groups.setdefault(key, []).append(job)
+
+    for group in groups.values():
+        group.sort(key=lambda i: i.string.id)
+        batch: t.List[Job] = []
+        tokens = 0
+        for job in group:
+            cost = count_tokens(job.string.text)
+            if batch and (tokens + cost > max_tokens or len(batch) >= max_size):
+                items.append(batch if len(batch) > 1 else batch[0])
+                batch, tokens = [], 0
+            batch.append(job)
+            tokens += cost
+        if batch:
+            items.append(batch if len(batch) > 1 else batch[0])
+    return items
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import typing as t
+from collections import OrderedDict
+from pathlib import Path
+
+# Message keys that affect the completion, anything else is ignored when hashing
+MESSAGE_KEYS = ("role", "content", "name", "function_call")
+
+
+def canonical_message(message: dict) -> dict:
+    canon = {k: message[k] for k in MESSAGE_KEYS if message.get(k) is not None}
+    if function_call := canon.get("function_call"):
+        arguments = function_call.get("arguments", "")
+        try:
+            # Same arguments in a different key order or spacing are the same call
+            arguments = json.dumps(json.loads(arguments), sort_keys=True, ensure_ascii=False)
+        except json.JSONDecodeError:
+            pass
+        canon["function_call"] = {"name": function_call.get("name"), "arguments": arguments}
+    return canon
+
+
+def cache_key(model: str, messages: t.List[dict], **params) -> str:
+    """Stable hash of everything that determines a completion"""
+    payload = {
+        "model": model,
+        "messages": [canonical_message(i) for i in messages],
+        "params": {k: v for k, v in params.items() if v is not None},
+    }
+    dump = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(dump.encode()).hexdigest()
+
+
+class ResponseCache:
+    """Content addressed completion cache with a memory LRU tier and an optional disk tier
+
+    Entries are stored as JSON and a fresh copy is returned on every hit,
+    so callers are free to mutate the responses they get back.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        directory: t.Optional[Path] = None,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.memory: t.OrderedDict[str, str] = OrderedDict()
+        self.stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+        self.disk_bytes: t.Optional[int] = None
+
+    def open_disk(self) -> bool:
+        """Set up the disk tier on first use, so creating the cache doesn't touch the disk"""
+        if not self.directory:
+            return False
+        if self.disk_bytes is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self.disk_bytes = sum(f.stat().st_size for f in self.directory.glob("*.json"))
+        return True
+
+    def path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> t.Optional[dict]:
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.stats["hits"] += 1
+            self.stats["memory_hits"] += 1
+            self.touch(key)
+            return json.loads(self.memory[key])
+        if self.open_disk() and (file := self.path(key)).exists():
+            try:
+                dump = file.read_text(encoding="utf-8")
+                response = json.loads(dump)
+            except (OSError, json.JSONDecodeError):
+                self.remove(file)
+            else:
+                self.touch(key)
+                self.remember(key, dump)
+                self.stats["hits"] += 1
+                self.stats["disk_hits"] += 1
+                return response
+        self.stats["misses"] += 1
+
+    def set(self, key: str, response: dict):
+        dump = json.dumps(response, ensure_ascii=False)
+        self.remember(key, dump)
+        self.stats["stores"] += 1
+        if not self.open_disk():
+            return
+        file = self.path(key)
+        if file.exists():
+            return
+        # Write to a temp file first so a crash can't leave a truncated entry behind
+        tmp = file.with_suffix(".tmp")
+        tmp.write_text(dump, encoding="utf-8")
+        tmp.replace(file)
+        self.disk_bytes += file.stat().st_size
+        if self.disk_bytes > self.max_disk_bytes:
+            self.prune()
+
+    def remember(self, key: str, dump: str):
+        self.memory[key] = dump
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def touch(self, key: str):
+        """Mark a disk entry as recently used, so pruning removes the least recently used ones"""
+        if self.open_disk():
+            try:
+                os.utime(self.path(key))
+            except OSError:
+                pass
+
+    def remove(self, file: Path):
+        try:
+            size = file.stat().st_size
+            file.unlink()
+        except OSError:
+            return
+        self.disk_bytes -= size
+
+    def prune(self):
+        """Delete the least recently used disk entries until the disk tier is under its size limit"""
+        entries = []
+        for file in self.directory.glob("*.json"):
+            try:
+                entries.append((file.stat().st_mtime, file))
+            except OSError:
+                continue
+        entries.sort()
+        # Leave some headroom so we don't prune on every store
+        target = self.max_disk_bytes * 0.9
+        for _, file in entries:
+            if self.disk_bytes <= target:
+                break
+            self.remove(file)
+
+    def summary(self) -> str:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        rate = round(self.stats["hits"] / lookups * 100, 1) if lookups else 0
+        return (
+            f"Cache: {self.stats['hits']}/{lookups} hits ({rate}%), "
+            f"{self.stats['memory_hits']} memory, {self.stats['disk_hits']} disk, "
+            f"{len(self.memory)} entries in memory, {round((self.disk_bytes or 0) / 1024)}KB on disk"
+        )
@@ -46,3 +46,49 @@ PRICES = {
     "gpt-4": [0.03, 0.06],
     "gpt-4-0301": [0.03, 0.06],
 }
+# Unicode scripts expected for each target language (by two letter code)
+# Languages missing from this map are not script checked while streaming
+SCRIPTS = {
+    "ar": {"ARABIC"},
+    "be": {"CYRILLIC"},
+    "bg": {"CYRILLIC"},
+    "bn": {"BENGALI"},
+    "cs": {"LATIN"},
+    "da": {"LATIN"},
+    "de": {"LATIN"},
+    "el": {"GREEK"},
+    "es": {"LATIN"},
+    "fa": {"ARABIC"},
+    "fi": {"LATIN"},
+    "fr": {"LATIN"},
+    "he": {"HEBREW"},
+    "hi": {"DEVANAGARI"},
+    "hr": {"LATIN"},
+    "hu": {"LATIN"},
+    "hy": {"ARMENIAN"},
+    "id": {"LATIN"},
+    "it": {"LATIN"},
+    "ja": {"CJK", "HIRAGANA", "KATAKANA"},
+    "ka": {"GEORGIAN"},
+    "kk": {"CYRILLIC"},
+    "ko": {"HANGUL", "CJK"},
+    "mk": {"CYRILLIC"},
+    "mr": {"DEVANAGARI"},
+    "ne": {"DEVANAGARI"},
+    "nl": {"LATIN"},
+    "no": {"LATIN"},
+    "pl": {"LATIN"},
+    "pt": {"LATIN"},
+    "ro": {"LATIN"},
+    "ru": {"CYRILLIC"},
+    "sk": {"LATIN"},
+    "sr": {"CYRILLIC", "LATIN"},
+    "sv": {"LATIN"},
+    "ta": {"TAMIL"},
+    "th": {"THAI"},
+    "tr": {"LATIN"},
+    "uk": {"CYRILLIC"},
+    "ur": {"ARABIC"},
+    "vi": {"LATIN"},
+    "zh": {"CJK"},
+}
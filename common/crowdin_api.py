@@ -1,45 +1,106 @@
+import asyncio
 import typing as t
 
-from aiohttp import ClientSession, ClientTimeout
+from aiohttp import ClientError, ClientSession, ClientTimeout
 
-from common.models import QA, Project, String, Translation
+from common.models import QA, Glossary, Project, StringRecord, Term, Translation
+from common.ratelimit import AdaptiveLimiter, backoff, retry_after
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class CrowdinError(Exception):
+    """A request failed even after retrying"""
 
 
 class CrowdinAPI:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, max_concurrency: int = 20, retries: int = 5):
         self.headers = {"Authorization": f"Bearer {api_key}"}
         self.base_url = "https://api.crowdin.com/api/v2"
-        self.timeout = ClientTimeout(total=10)
+        self.timeout = ClientTimeout(total=60, connect=10)
+        self.retries = retries
+        self.limiter = AdaptiveLimiter(initial=min(4, max_concurrency), maximum=max_concurrency)
+        self.session: t.Optional[ClientSession] = None
 
-    async def get_projects(self) -> t.List[Project]:
-        url = f"{self.base_url}/projects"
-        params = {"offset": 0, "limit": 500}
-        projects = []
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        params: t.Optional[dict] = None,
+        payload: t.Optional[dict] = None,
+    ) -> t.Tuple[int, dict]:
+        """Make a rate limited request, retrying throttled requests and failed GETs
+
+        Non idempotent requests are only retried when throttled, since the API rejected them outright
+        """
+        if self.session is None or self.session.closed:
+            self.session = ClientSession(timeout=self.timeout, headers=self.headers)
+        idempotent = method == "GET"
+        attempt = 0
         while True:
-            async with ClientSession(timeout=self.timeout, headers=self.headers) as session:
-                async with session.get(url=url, params=params) as res:
-                    data = await res.json()
-                    if not data:
-                        break
-                    if not data["data"]:
-                        break
-                    projects += [Project.parse_obj(i["data"]) for i in data["data"]]
-                    params["offset"] += 500
-        return projects
-
-    async def get_strings(self, project_id: int) -> t.List[String]:
-        url = f"{self.base_url}/projects/{project_id}/strings"
+            await self.limiter.acquire()
+            # Timeouts and connection errors mean the API is struggling, same as a 429 or 5xx
+            congested = True
+            try:
+                async with self.session.request(method, url, params=params, json=payload) as res:
+                    status = res.status
+                    throttled = status == 429
+                    congested = status in RETRY_STATUSES
+                    wait = retry_after(res.headers)
+                    try:
+                        data = await res.json(content_type=None)
+                    except ValueError:
+                        data = {}
+            except (ClientError, asyncio.TimeoutError) as e:
+                if not idempotent or attempt >= self.retries:
+                    raise
+                print(f"Crowdin request failed ({e.__class__.__name__}), retrying")
+                attempt += 1
+                await asyncio.sleep(backoff(attempt))
+                continue
+            finally:
+                await self.limiter.release(congested)
+
+            if wait is not None:
+                # Also on successful responses, so running out of quota doesn't have to cause a 429
+                self.limiter.pause(wait)
+            retryable = throttled or (idempotent and status in RETRY_STATUSES)
+            if not retryable or attempt >= self.retries:
+                return status, data or {}
+            attempt += 1
+            delay = wait if wait is not None else backoff(attempt)
+            print(f"Crowdin returned {status}, retrying in {round(delay, 1)}s")
+            await asyncio.sleep(delay)
+
+    async def paginate(self, url: str) -> t.List[dict]:
+        """Fetch every page of a listing, raises CrowdinError if a page can't be fetched"""
         params = {"offset": 0, "limit": 500}
-        sources = []
+        items = []
         while True:
-            async with ClientSession(timeout=self.timeout, headers=self.headers) as session:
-                async with session.get(url=url, params=params) as res:
-                    data = await res.json()
-                    if not data["data"]:
-                        break
-                    sources += [String.parse_obj(i["data"]) for i in data["data"]]
-                    params["offset"] += 500
-        return sources
+            status, data = await self.request("GET", url, params=params)
+            if "data" not in data:
+                # A partial listing would be mistaken for the full one, ex: checkpointed as the job list
+                raise CrowdinError(f"Crowdin error fetching {url} (status {status}): {data}")
+            if not data["data"]:
+                break
+            items += [i["data"] for i in data["data"]]
+            if len(data["data"]) < params["limit"]:
+                break
+            params["offset"] += params["limit"]
+        return items
+
+    async def get_projects(self) -> t.List[Project]:
+        url = f"{self.base_url}/projects"
+        return [Project.parse_obj(i) for i in await self.paginate(url)]
+
+    async def get_strings(self, project_id: int) -> t.List[StringRecord]:
+        """Strings are returned unvalidated since projects can have tens of thousands of them"""
+        url = f"{self.base_url}/projects/{project_id}/strings"
+        return [StringRecord(i) for i in await self.paginate(url)]
 
     async def get_translation(
         self,
@@ -50,31 +111,27 @@ class CrowdinAPI:
         """If translation is None, then string needs translation"""
         url = f"{self.base_url}/projects/{project_id}/translations"
         params = {"stringId": string_id, "languageId": language_id}
-        async with ClientSession(timeout=self.timeout, headers=self.headers) as session:
-            async with session.get(url=url, params=params) as res:
-                translations = await res.json()
-                if "data" not in translations:
-                    print(f"Crowdin translation check error: {translations}")
-                    return
-                if not translations["data"]:
-                    return
-                if not translations["data"][0]["data"]:
-                    return
-                return Translation.parse_obj(translations["data"][0]["data"])
+        _, translations = await self.request("GET", url, params=params)
+        if "data" not in translations:
+            print(f"Crowdin translation check error: {translations}")
+            return
+        if not translations["data"]:
+            return
+        if not translations["data"][0]["data"]:
+            return
+        return Translation.parse_obj(translations["data"][0]["data"])
 
     async def get_qa_issues(self, project_id: int) -> t.List[QA]:
         url = f"{self.base_url}/projects/{project_id}/qa-checks"
-        params = {"offset": 0, "limit": 500}
-        issues = []
-        while True:
-            async with ClientSession(timeout=self.timeout, headers=self.headers) as session:
-                async with session.get(url=url, params=params) as res:
-                    data = await res.json()
-                    if not data["data"]:
-                        break
-                    issues += [QA.parse_obj(i["data"]) for i in data["data"]]
-                    params["offset"] += 500
-        return issues
+        return [QA.parse_obj(i) for i in await self.paginate(url)]
+
+    async def get_glossaries(self) -> t.List[Glossary]:
+        url = f"{self.base_url}/glossaries"
+        return [Glossary.parse_obj(i) for i in await self.paginate(url)]
+
+    async def get_terms(self, glossary_id: int) -> t.List[Term]:
+        url = f"{self.base_url}/glossaries/{glossary_id}/terms"
+        return [Term.parse_obj(i) for i in await self.paginate(url)]
 
     async def upload_translation(
         self,
@@ -85,7 +142,4 @@ class CrowdinAPI:
     ) -> t.Tuple[int, dict]:
         url = f"{self.base_url}/projects/{project_id}/translations"
         payload = {"stringId": string_id, "languageId": language_id, "text": text}
-        async with ClientSession(timeout=self.timeout, headers=self.headers) as session:
-            async with session.post(url=url, json=payload) as res:
-                data = await res.json()
-                return res.status, data
+        return await self.request("POST", url, payload=payload)
@@ -0,0 +1,205 @@
+import asyncio
+import hmac
+import json
+import typing as t
+
+from aiohttp import web
+
+from common.constants import cyan, red, yellow
+from common.crowdin_api import CrowdinAPI
+from common.glossary import load_glossary
+from common.jobs import Job, ProcessedKeys
+from common.models import Project
+from common.processing import (
+    glossary,
+    in_shard,
+    plain_strings,
+    response_cache,
+    shutdown,
+    translation_worker,
+)
+
+from . import (
+    CROWDIN_CONCURRENCY,
+    CROWDIN_KEY,
+    GLOSSARY,
+    POLL_INTERVAL,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET,
+    WORKERS,
+    glossary_path,
+    init_data,
+    processed_json,
+)
+
+# Crowdin webhook events that can leave a string needing translation
+STRING_EVENTS = ("string.added", "string.updated", "file.added", "file.updated")
+# Header the Crowdin webhook has to send WEBHOOK_SECRET in
+SECRET_HEADER = "X-Webhook-Secret"
+# Seconds to wait before restarting a worker that crashed
+RESTART_DELAY = 5
+
+
+class Watcher:
+    """Keeps Crowdin state in memory and enqueues only strings that are new or changed
+
+    Projects are re-scanned when their lastActivity changes, or right away when
+    a Crowdin webhook reports a string event for them.
+    """
+
+    def __init__(self, client: CrowdinAPI):
+        self.client = client
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.processed = ProcessedKeys(processed_json)
+        self.projects: t.Dict[int, Project] = {}
+        # project id -> {string id: revision}
+        self.revisions: t.Dict[int, t.Dict[int, int]] = {}
+        # project id -> target language ids that have been scanned
+        self.languages: t.Dict[int, t.Set[str]] = {}
+        self.queued: t.Set[str] = set()
+        self.dirty: t.Set[int] = set()
+        self.wake = asyncio.Event()
+
+    def enqueue(self, job: Job):
+        if job.key in self.queued:
+            return
+        self.queued.add(job.key)
+        self.queue.put_nowait(job)
+
+    def done(self, job: Job):
+        self.queued.discard(job.key)
+
+    async def poll(self):
+        projects = await self.client.get_projects()
+        for project in projects:
+            previous = self.projects.get(project.id)
+            self.projects[project.id] = project
+            changed = previous is None or previous.lastActivity != project.lastActivity
+            if changed or project.id in self.dirty:
+                await self.scan(project)
+        self.dirty.clear()
+
+    async def scan(self, project: Project):
+        strings = await self.client.get_strings(project.id)
+        known = self.revisions.get(project.id)
+        scanned = self.languages.get(project.id, set())
+        before = self.queue.qsize()
+        for string in plain_strings(project, strings):
+            # Strings that are new or were edited since the last scan need checking again
+            changed = known is not None and known.get(string.id) != string.revision
+            for lang in project.targetLanguages:
+                if not in_shard(project.id, lang.id):
+                    continue
+                job = Job(project, lang, string)
+                if changed:
+                    self.enqueue(job)
+                elif lang.id not in scanned and job.key not in self.processed:
+                    self.enqueue(job)
+        self.revisions[project.id] = {string.id: string.revision for string in strings}
+        self.languages[project.id] = {lang.id for lang in project.targetLanguages}
+        if added := self.queue.qsize() - before:
+            print(cyan(f"Queued {added} jobs for project '{project.name}'"))
+
+    async def work(self):
+        """Run a translation worker until shutdown, restarting it if it crashes"""
+        while True:
+            try:
+                return await translation_worker(
+                    self.client, self.queue, self.processed, on_done=self.done
+                )
+            except Exception as e:
+                print(red(f"Translation worker crashed, restarting it: {e!r}"))
+                await asyncio.sleep(RESTART_DELAY)
+
+    async def handle_webhook(self, request: web.Request) -> web.Response:
+        secret = request.headers.get(SECRET_HEADER, "")
+        if WEBHOOK_SECRET and not hmac.compare_digest(secret.encode(), WEBHOOK_SECRET.encode()):
+            return web.Response(status=401)
+        try:
+            data = await request.json()
+        except json.JSONDecodeError:
+            return web.Response(status=400)
+        events = data.get("events", [data]) if isinstance(data, dict) else None
+        if not isinstance(events, list):
+            return web.Response(status=400)
+        projects = set()
+        for event in events:
+            if not isinstance(event, dict):
+                return web.Response(status=400)
+            if event.get("event") not in STRING_EVENTS:
+                continue
+            try:
+                if project_id := find_project_id(event):
+                    projects.add(int(project_id))
+            except (TypeError, ValueError):
+                return web.Response(status=400)
+        if projects:
+            self.dirty |= projects
+            self.wake.set()
+        return web.Response(text="ok")
+
+    async def serve(self) -> t.Optional[web.AppRunner]:
+        if not WEBHOOK_PORT:
+            return
+        if not WEBHOOK_SECRET and WEBHOOK_HOST not in ("127.0.0.1", "localhost", "::1"):
+            # Anyone who can reach the listener could force full project rescans
+            print(red(f"Set WEBHOOK_SECRET to listen on {WEBHOOK_HOST}, only polling"))
+            return
+        app = web.Application()
+        app.router.add_post("/", self.handle_webhook)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+        except OSError as e:
+            print(red(f"Can't listen on {WEBHOOK_HOST}:{WEBHOOK_PORT} ({e}), only polling"))
+            await runner.cleanup()
+            return
+        print(yellow(f"Listening for Crowdin webhooks on {WEBHOOK_HOST}:{WEBHOOK_PORT}"))
+        return runner
+
+    async def sleep(self):
+        """Wait for the next poll, a webhook event or a shutdown, whichever comes first"""
+        waiters = [asyncio.create_task(self.wake.wait()), asyncio.create_task(shutdown.wait())]
+        await asyncio.wait(waiters, timeout=POLL_INTERVAL, return_when=asyncio.FIRST_COMPLETED)
+        for waiter in waiters:
+            waiter.cancel()
+        self.wake.clear()
+
+
+def find_project_id(event: dict) -> t.Optional[int]:
+    for key in ("string", "file"):
+        if isinstance(event.get(key), dict):
+            project = event[key].get("project") or {}
+            if project_id := project.get("id") or event[key].get("projectId"):
+                return project_id
+    if isinstance(event.get("project"), dict):
+        return event["project"].get("id")
+    return event.get("projectId")
+
+
+async def watch_translations():
+    """Long running mode that keeps clients and caches warm and translates strings as they appear"""
+    init_data()
+    client = CrowdinAPI(api_key=CROWDIN_KEY, max_concurrency=CROWDIN_CONCURRENCY)
+    await load_glossary(glossary, client, GLOSSARY, glossary_path)
+    watcher = Watcher(client)
+    runner = None
+    workers = [asyncio.create_task(watcher.work()) for _ in range(max(WORKERS, 1))]
+    try:
+        runner = await watcher.serve()
+        while not shutdown.is_set():
+            try:
+                await watcher.poll()
+            except Exception as e:
+                print(red(f"Failed to poll Crowdin: {e}"))
+            await watcher.sleep()
+    finally:
+        for _ in workers:
+            watcher.queue.put_nowait(None)
+        await asyncio.gather(*workers)
+        if runner:
+            await runner.cleanup()
+        await client.close()
+        print(cyan(response_cache.summary()))
@@ -0,0 +1,159 @@
+import json
+import typing as t
+
+from common.batching import group_jobs
+from common.constants import PRICES, cyan, red, yellow
+from common.crowdin_api import CrowdinAPI
+from common.glossary import load_glossary
+from common.jobs import Job
+from common.processing import (
+    build_batch_messages,
+    build_messages,
+    discover_jobs,
+    glossary,
+)
+from common.tokenizer import count_message_tokens, count_tokens
+
+from . import (
+    BATCH,
+    BATCH_SIZE,
+    BATCH_TOKENS,
+    CROWDIN_CONCURRENCY,
+    CROWDIN_KEY,
+    GLOSSARY,
+    MODEL,
+    PRE_TRANSLATE,
+    WORKERS,
+    glossary_path,
+    history_json,
+    init_data,
+)
+
+# Defaults for when there is no usage history yet
+CALLS_PER_STRING = 1.3
+COMPLETION_RATIO = 1.6
+SECONDS_PER_TOKEN = 0.03
+CROWDIN_SECONDS_PER_STRING = 0.8
+# Tokens added by a correction prompt on follow up calls
+CORRECTION_TOKENS = 40
+# Tokens each translation takes up in a batch reply besides the text itself
+JSON_TOKENS = 6
+
+
+def history() -> t.Tuple[float, float, float, float]:
+    """Rates from past runs
+
+    Calls per string, completion tokens per source token, seconds per completion token
+    and seconds of Crowdin requests (checking and uploading) per string
+    """
+    stats = json.loads(history_json.read_text())
+    strings = stats["strings"]
+    calls_per_string = stats["calls"] / strings if strings else CALLS_PER_STRING
+    completion_ratio = (
+        stats["completion"] / stats["source"] if stats["source"] else COMPLETION_RATIO
+    )
+    timed = stats.get("timed_completion", 0)
+    seconds_per_token = stats["seconds"] / timed if timed else SECONDS_PER_TOKEN
+    crowdin = stats.get("crowdin_seconds", 0)
+    crowdin_per_string = crowdin / strings if strings and crowdin else CROWDIN_SECONDS_PER_STRING
+    return calls_per_string, completion_ratio, seconds_per_token, crowdin_per_string
+
+
+def estimate_job(job: Job, calls: float, completion_ratio: float) -> t.Tuple[float, float]:
+    """Projected prompt and completion tokens of translating a single string"""
+    source_tokens = count_tokens(job.string.text)
+    prefix = count_message_tokens(build_messages(job.language, job.string.text))
+    if PRE_TRANSLATE:
+        # The pre-translation is injected as a function call and its result
+        prefix += round(source_tokens * completion_ratio / calls) + 20
+    completion = source_tokens * completion_ratio
+    per_call = completion / calls
+    # Every follow up call resends the conversation, plus the last reply and a correction
+    prompt = calls * prefix + calls * (calls - 1) / 2 * (per_call + CORRECTION_TOKENS)
+    return prompt, completion
+
+
+def estimate_batch(
+    jobs: t.List[Job], calls: float, completion_ratio: float
+) -> t.Tuple[float, float]:
+    """Projected tokens of translating a group of strings in one call"""
+    prompt = count_message_tokens(build_batch_messages(jobs[0].language, [i.string for i in jobs]))
+    completion = 0
+    for job in jobs:
+        # One call per group, plus the JSON keys and quotes around each translation
+        completion += count_tokens(job.string.text) * completion_ratio / calls + JSON_TOKENS
+    return prompt, completion
+
+
+async def estimate_translations():
+    """Project tokens, cost and time of a translation run without calling the LLM"""
+    init_data()
+    client = CrowdinAPI(api_key=CROWDIN_KEY, max_concurrency=CROWDIN_CONCURRENCY)
+    try:
+        jobs = await discover_jobs(client)
+        await load_glossary(glossary, client, GLOSSARY, glossary_path)
+    finally:
+        await client.close()
+    if not jobs:
+        print(yellow("Nothing to translate"))
+        return
+
+    calls, completion_ratio, seconds_per_token, crowdin_per_string = history()
+    prices = PRICES.get(MODEL)
+    if not prices:
+        print(red(f"No pricing for {MODEL}, costs can't be estimated"))
+    concurrency = max(WORKERS, 1)
+    print(
+        cyan(
+            f"{round(calls, 2)} calls per string, {round(completion_ratio, 2)} completion tokens "
+            f"per source token, {round(seconds_per_token * 1000)}ms per completion token, "
+            f"{round(crowdin_per_string, 2)}s of Crowdin requests per string, {concurrency} workers"
+        )
+    )
+
+    groups: t.Dict[t.Tuple[str, str], t.List[Job]] = {}
+    for job in jobs:
+        groups.setdefault((job.project.name, job.language.name), []).append(job)
+
+    header = f"{'Project':<30} {'Language':<22} {'Strings':>8} {'Prompt':>10} {'Completion':>11} {'Cost':>9} {'Time':>9}"
+    print(header)
+    print("-" * len(header))
+    totals = {"strings": 0, "prompt": 0, "completion": 0, "cost": 0, "seconds": 0}
+    for (project, language), group in groups.items():
+        prompt = completion = 0
+        for item in group_jobs(group, BATCH_TOKENS, BATCH_SIZE) if BATCH else group:
+            if isinstance(item, list):
+                item_prompt, item_completion = estimate_batch(item, calls, completion_ratio)
+            else:
+                item_prompt, item_completion = estimate_job(item, calls, completion_ratio)
+            prompt += item_prompt
+            completion += item_completion
+        cost = (prompt / 1000) * prices[0] + (completion / 1000) * prices[1] if prices else 0
+        # Generation time scales with the reply length, and every string is checked and uploaded
+        seconds = (completion * seconds_per_token + len(group) * crowdin_per_string) / concurrency
+        totals["strings"] += len(group)
+        totals["prompt"] += prompt
+        totals["completion"] += completion
+        totals["cost"] += cost
+        totals["seconds"] += seconds
+        print(
+            f"{project[:30]:<30} {language[:22]:<22} {len(group):>8} {round(prompt):>10} "
+            f"{round(completion):>11} {'$' + str(round(cost, 2)):>9} {format_duration(seconds):>9}"
+        )
+    print("-" * len(header))
+    print(
+        yellow(
+            f"{'Total':<53} {totals['strings']:>8} {round(totals['prompt']):>10} "
+            f"{round(totals['completion']):>11} {'$' + str(round(totals['cost'], 2)):>9} "
+            f"{format_duration(totals['seconds']):>9}"
+        )
+    )
+    print("Strings already translated on Crowdin are skipped during a run, so this is an upper bound")
+
+
+def format_duration(seconds: float) -> str:
+    hours, remainder = divmod(round(seconds), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours:
+        return f"{hours}h{minutes:02}m"
+    return f"{minutes}m{seconds:02}s"
@@ -0,0 +1,152 @@
+import csv
+import json
+import typing as t
+from collections import deque
+from pathlib import Path
+
+from common.constants import yellow
+from common.crowdin_api import CrowdinAPI
+
+
+class Automaton:
+    """Aho-Corasick matcher, finds every pattern in a text in a single pass
+
+    Matching is case insensitive (casefolded, so "STRASSE" matches "Straße") and only whole words
+    count, so "log" doesn't match "logging"
+    """
+
+    def __init__(self, patterns: t.Iterable[str]):
+        self.goto: t.List[t.Dict[str, int]] = [{}]
+        self.fail: t.List[int] = [0]
+        # Patterns ending at each node, with their casefolded length to find where they start
+        self.output: t.List[t.List[t.Tuple[str, int]]] = [[]]
+        for pattern in patterns:
+            self.add(pattern)
+        self.build()
+
+    def add(self, pattern: str):
+        node = 0
+        folded = pattern.casefold()
+        for char in folded:
+            if char not in self.goto[node]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[node][char] = len(self.goto) - 1
+            node = self.goto[node][char]
+        self.output[node].append((pattern, len(folded)))
+
+    def build(self):
+        """Link every node to the longest suffix that is also a prefix of some pattern"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0) if node else 0
+                self.output[child] += self.output[self.fail[child]]
+
+    def search(self, text: str) -> t.Set[str]:
+        found = set()
+        folded = text.casefold()
+        node = 0
+        for idx, char in enumerate(folded):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for pattern, length in self.output[node]:
+                # Casefolding can change the length, ex: "ß" -> "ss", so use the folded length
+                start = idx - length + 1
+                if is_boundary(folded, start - 1) and is_boundary(folded, idx + 1):
+                    found.add(pattern)
+        return found
+
+
+def is_boundary(text: str, idx: int) -> bool:
+    return idx < 0 or idx >= len(text) or not text[idx].isalnum()
+
+
+def glossary_prompt(terms: t.List[t.Tuple[str, str]]) -> str:
+    lines = "\n".join(f'- "{term}" -> "{translation}"' for term, translation in terms)
+    return f"Use these glossary translations for the following terms, there is no need to look them up:\n{lines}"
+
+
+class TermIndex:
+    """Glossary terms compiled for fast lookup of the ones that appear in a source string"""
+
+    def __init__(self):
+        # source term -> {language id: translation}
+        self.terms: t.Dict[str, t.Dict[str, str]] = {}
+        self.automaton: t.Optional[Automaton] = None
+
+    def __len__(self):
+        return len(self.terms)
+
+    def add(self, term: str, translations: t.Dict[str, str]):
+        term = term.strip()
+        if not term:
+            return
+        self.terms.setdefault(term, {}).update({k: v for k, v in translations.items() if v})
+        self.automaton = None
+
+    def lookup(self, text: str, language_id: str) -> t.List[t.Tuple[str, str]]:
+        """Return (term, translation) pairs for terms in the text that have a translation"""
+        if not self.terms or not isinstance(text, str):
+            return []
+        if self.automaton is None:
+            self.automaton = Automaton(self.terms)
+        matches = []
+        for term in sorted(self.automaton.search(text)):
+            translations = self.terms[term]
+            # Local glossaries may only use the two letter code, ex: "pt" for "pt-BR"
+            translation = translations.get(language_id) or translations.get(language_id.split("-")[0])
+            if translation:
+                matches.append((term, translation))
+        return matches
+
+    def load_file(self, path: Path):
+        """Load a local glossary
+
+        JSON: {"term": {"de": "Begriff", "fr": "terme"}}
+        CSV: a "term" column followed by one column per language id
+        """
+        if path.suffix.lower() == ".csv":
+            with path.open(encoding="utf-8", newline="") as f:
+                for row in csv.DictReader(f):
+                    term = row.pop("term", "")
+                    self.add(term, {k: v.strip() for k, v in row.items() if k and v})
+        else:
+            for term, translations in json.loads(path.read_text(encoding="utf-8")).items():
+                self.add(term, translations)
+
+    async def load_crowdin(self, client: CrowdinAPI):
+        """Load every glossary on the account, terms are linked to their translations by concept"""
+        for glossary in await client.get_glossaries():
+            concepts: t.Dict[int, t.Dict[str, t.List[str]]] = {}
+            for term in await client.get_terms(glossary.id):
+                if term.conceptId is None:
+                    continue
+                concepts.setdefault(term.conceptId, {}).setdefault(term.languageId, []).append(
+                    term.text
+                )
+            for concept in concepts.values():
+                translations = {lang: texts[0] for lang, texts in concept.items()}
+                for source in concept.get(glossary.languageId, []):
+                    self.add(source, translations)
+
+
+async def load_glossary(
+    index: TermIndex,
+    client: CrowdinAPI,
+    from_crowdin: bool,
+    path: t.Optional[Path],
+):
+    if from_crowdin:
+        await index.load_crowdin(client)
+    if path:
+        index.load_file(path)
+    if len(index):
+        print(yellow(f"Loaded {len(index)} glossary terms"))
@@ -0,0 +1,148 @@
+import json
+import shutil
+import typing as t
+from pathlib import Path
+
+from common.models import Language, Project, StringRecord
+
+
+class Job:
+    def __init__(self, project: Project, language: Language, string: StringRecord):
+        self.project = project
+        self.language = language
+        self.string = string
+
+    @property
+    def key(self) -> str:
+        return f"{self.project.id}-{self.string.id}-{self.language.id}"
+
+    def __str__(self):
+        return self.key
+
+
+def write_atomic(path: Path, text: str):
+    """Write to a temp file first so a crash mid-write never leaves a corrupt file behind"""
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    tmp.replace(path)
+
+
+class ProcessedKeys:
+    """Keys of translated jobs, saved as a list with a set alongside for fast lookups"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.keys: t.List[str] = json.loads(path.read_text())
+        self.lookup = set(self.keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.lookup
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key: str):
+        if key in self.lookup:
+            return
+        self.keys.append(key)
+        self.lookup.add(key)
+        write_atomic(self.path, json.dumps(self.keys))
+
+
+class Checkpoint:
+    """Crash-safe record of a run so it can resume exactly where it stopped
+
+    - jobs.json: the pending job queue, written once after discovery
+    - done.log: keys of finished jobs, appended as they complete
+    - conversations/: the message history of jobs that are in-flight
+    - usage.json: tokens used so far this run, across resumes
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.jobs_file = directory / "jobs.json"
+        self.done_file = directory / "done.log"
+        self.usage_file = directory / "usage.json"
+        self.conversations_dir = directory / "conversations"
+        self.active = False
+        self.usage = {"total": 0, "prompt": 0, "completion": 0}
+
+    def exists(self) -> bool:
+        return self.jobs_file.exists()
+
+    def start(self, jobs: t.List[Job]):
+        """Begin a new checkpoint for the given job queue, discarding any previous one"""
+        self.clear()
+        self.conversations_dir.mkdir(parents=True, exist_ok=True)
+        projects = {}
+        strings = {}
+        for job in jobs:
+            projects[job.project.id] = json.loads(job.project.json())
+            strings[f"{job.project.id}-{job.string.id}"] = job.string.to_dict()
+        dump = {
+            "projects": projects,
+            "strings": strings,
+            "jobs": [[job.project.id, job.string.id, job.language.id] for job in jobs],
+        }
+        write_atomic(self.jobs_file, json.dumps(dump))
+        self.done_file.touch()
+        self.active = True
+
+    def load(self) -> t.List[Job]:
+        """Load the jobs that haven't finished yet from a previous run"""
+        dump = json.loads(self.jobs_file.read_text(encoding="utf-8"))
+        done = set(self.done_file.read_text().split()) if self.done_file.exists() else set()
+        if self.usage_file.exists():
+            self.usage = json.loads(self.usage_file.read_text())
+        self.conversations_dir.mkdir(parents=True, exist_ok=True)
+
+        projects = {int(k): Project.parse_obj(v) for k, v in dump["projects"].items()}
+        languages = {
+            (project.id, lang.id): lang
+            for project in projects.values()
+            for lang in project.targetLanguages
+        }
+        strings = {k: StringRecord(v) for k, v in dump["strings"].items()}
+        jobs = []
+        for project_id, string_id, language_id in dump["jobs"]:
+            job = Job(
+                project=projects[project_id],
+                language=languages[(project_id, language_id)],
+                string=strings[f"{project_id}-{string_id}"],
+            )
+            if job.key not in done:
+                jobs.append(job)
+        self.active = True
+        return jobs
+
+    def finish(self, key: str):
+        if not self.active:
+            return
+        with self.done_file.open("a") as f:
+            f.write(key + "\n")
+        (self.conversations_dir / f"{key}.json").unlink(missing_ok=True)
+
+    def save_conversation(self, key: str, messages: t.List[dict]):
+        if not self.active:
+            return
+        write_atomic(self.conversations_dir / f"{key}.json", json.dumps(messages))
+
+    def load_conversation(self, key: str) -> t.Optional[t.List[dict]]:
+        file = self.conversations_dir / f"{key}.json"
+        if not self.active or not file.exists():
+            return
+        return json.loads(file.read_text(encoding="utf-8"))
+
+    def add_usage(self, usage: dict):
+        if not self.active:
+            return
+        self.usage["total"] += usage.get("total_tokens", 0)
+        self.usage["prompt"] += usage.get("prompt_tokens", 0)
+        self.usage["completion"] += usage.get("completion_tokens", 0)
+        write_atomic(self.usage_file, json.dumps(self.usage))
+
+    def clear(self):
+        """Remove the checkpoint once a run has completed"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.active = False
+        self.usage = {"total": 0, "prompt": 0, "completion": 0}
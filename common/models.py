@@ -82,3 +82,100 @@ class Project(BaseModel):
     updatedAt: datetime
     lastActivity: datetime
     targetLanguages: t.List[Language]
+
+
+def parse_datetime(value: t.Union[str, datetime, None]) -> t.Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+class StringRecord:
+    """Unvalidated, slotted version of String for bulk fetches
+
+    Projects can have tens of thousands of strings, fully validating each one
+    is slow and memory hungry when processing only needs a few fields.
+    Timestamps are kept as the raw API strings until they're accessed.
+    """
+
+    __slots__ = (
+        "id",
+        "projectId",
+        "fileId",
+        "branchId",
+        "directoryId",
+        "identifier",
+        "text",
+        "type",
+        "context",
+        "maxLength",
+        "isHidden",
+        "isDuplicate",
+        "masterStringId",
+        "revision",
+        "hasPlurals",
+        "isIcu",
+        "labelIds",
+        "_createdAt",
+        "_updatedAt",
+    )
+
+    def __init__(self, data: dict):
+        self.id: int = data["id"]
+        self.projectId: int = data["projectId"]
+        self.fileId: t.Optional[int] = data.get("fileId")
+        self.branchId: t.Optional[int] = data.get("branchId")
+        self.directoryId: t.Optional[int] = data.get("directoryId")
+        self.identifier: str = data.get("identifier", "")
+        self.text: str = data["text"]
+        self.type: str = data.get("type", "text")
+        self.context: str = data.get("context") or ""
+        self.maxLength: int = data.get("maxLength", 0)
+        self.isHidden: bool = data.get("isHidden", False)
+        self.isDuplicate: bool = data.get("isDuplicate", False)
+        self.masterStringId: t.Optional[str] = data.get("masterStringId")
+        self.revision: int = data.get("revision", 0)
+        self.hasPlurals: bool = data.get("hasPlurals", False)
+        self.isIcu: bool = data.get("isIcu", False)
+        self.labelIds: list = data.get("labelIds", [])
+        self._createdAt: t.Union[str, datetime, None] = data.get("createdAt")
+        self._updatedAt: t.Union[str, datetime, None] = data.get("updatedAt")
+
+    def __repr__(self):
+        return f"StringRecord(id={self.id}, projectId={self.projectId}, text={self.text!r})"
+
+    @property
+    def createdAt(self) -> t.Optional[datetime]:
+        self._createdAt = parse_datetime(self._createdAt)
+        return self._createdAt
+
+    @property
+    def updatedAt(self) -> t.Optional[datetime]:
+        self._updatedAt = parse_datetime(self._updatedAt)
+        return self._updatedAt
+
+    def to_dict(self) -> dict:
+        """Raw dict in the same shape as the API returned it"""
+        data = {k: getattr(self, k) for k in self.__slots__ if not k.startswith("_")}
+        for key in ("createdAt", "updatedAt"):
+            value = getattr(self, f"_{key}")
+            data[key] = value.isoformat() if isinstance(value, datetime) else value
+        return data
+
+    def validate(self) -> String:
+        """Fully validated String model, for when the other fields are actually needed"""
+        return String.parse_obj(self.to_dict())
+
+
+class Glossary(BaseModel):
+    id: int
+    name: str
+    languageId: str
+
+
+class Term(BaseModel):
+    id: int
+    glossaryId: int
+    languageId: str
+    text: str
+    conceptId: t.Optional[int] = None
@@ -1,33 +1,51 @@
+import asyncio
 import json
 import typing as t
 from datetime import datetime
-from time import sleep
-
-import openai
-from aiocache import cached
-from openai.error import (
-    APIConnectionError,
-    APIError,
-    RateLimitError,
-    ServiceUnavailableError,
-)
+from time import perf_counter
 
+from common.batching import group_jobs
+from common.cache import ResponseCache, cache_key
 from common.constants import PRICES, TRANSLATE, cyan, green, red, yellow
 from common.crowdin_api import CrowdinAPI
-from common.models import QA, Language, Project, String, Translation
+from common.glossary import TermIndex, glossary_prompt, load_glossary
+from common.jobs import Checkpoint, Job, ProcessedKeys, write_atomic
+from common.models import QA, Language, Project, StringRecord, Translation
+from common.sharding import CoordinationStore, shard_of
+from common.streaming import StreamValidator, consume_stream
+from common.tokenizer import count_message_tokens, count_tokens
 from common.translate_api import TranslateManager
 
 from . import (
     AUTO,
-    BACKTICK_MISMATCH,
+    BATCH,
+    BATCH_SIZE,
+    BATCH_TOKENS,
+    CACHE_DISK,
+    CACHE_DISK_MB,
+    CACHE_SIZE,
+    CROWDIN_CONCURRENCY,
     CROWDIN_KEY,
     DEEPL_KEY,
     ENDPOINT_OVERRIDE,
+    GLOSSARY,
     MODEL,
     OPENAI_KEY,
-    PLACEHOLDER_MISMATCH,
     PRE_TRANSLATE,
     PROCESS_QA,
+    SHARD_COUNT,
+    SHARD_INDEX,
+    STREAM,
+    WORKERS,
+    batch_prompt_path,
+    cache_dir,
+    checkpoint_dir,
+    coordination_db,
+    correction_prompt_dir,
+    glossary_path,
+    history_json,
+    init_data,
+    load_prompt,
     messages_dir,
     processed_json,
     processed_qa_json,
@@ -36,6 +54,31 @@ from . import (
 )
 
 ADDON = "\nRevise your translation and return only the updated version"
+# Example translations shown to the model before the actual string(s)
+FEW_SHOT = [
+    ("Hello, how are you?", "¿Hola, cómo estás?"),
+    ("{}\nCog Version: {}\nAuthor: {}", "{}\nVersión de Cog: {}\nAutor: {}"),
+    ("Invalid schema!\n**Missing**\n{}", "Geçersiz şema!\n**Eksik**\n{}"),
+]
+
+response_cache = ResponseCache(
+    max_entries=CACHE_SIZE,
+    directory=cache_dir if CACHE_DISK else None,
+    max_disk_bytes=CACHE_DISK_MB * 1024 * 1024,
+)
+checkpoint = Checkpoint(checkpoint_dir)
+# Progress and usage shared between shards, only used when running as one
+coordination = (
+    CoordinationStore(coordination_db, SHARD_INDEX)
+    if SHARD_COUNT > 1 and SHARD_INDEX >= 0
+    else None
+)
+# Glossary terms, loaded by the entry points
+glossary = TermIndex()
+# Shared so its language index stays warm between strings
+translator = TranslateManager(deepl_key=DEEPL_KEY)
+# Set when a shutdown is requested, workers finish their current step and stop
+shutdown = asyncio.Event()
 
 
 def static_processing(source: str, dest: str) -> str:
@@ -74,31 +117,88 @@ def static_processing(source: str, dest: str) -> str:
 
 
 def update_tokens(response: dict):
+    if response.get("cached"):
+        return
+    checkpoint.add_usage(response["usage"])
+    if coordination:
+        coordination.add_usage(response["usage"])
     usage = json.loads(tokens_json.read_text())
     usage["total"] += response["usage"].get("total_tokens", 0)
     usage["prompt"] += response["usage"].get("prompt_tokens", 0)
     usage["completion"] += response["usage"].get("completion_tokens", 0)
-    tokens_json.write_text(json.dumps(usage))
+    write_atomic(tokens_json, json.dumps(usage))
+
+
+def record_call(response: dict):
+    """Count a translation call for the estimator
+
+    Replayed completions still count towards calls and completion tokens, so the ratios stay
+    consistent with record_string, but only real calls are timed.
+    """
+    stats = json.loads(history_json.read_text())
+    completion = response["usage"].get("completion_tokens", 0)
+    stats["calls"] += 1
+    stats["completion"] += completion
+    if not response.get("cached"):
+        # Latency is tracked per completion token since batched replies are much longer
+        stats["timed_completion"] = stats.get("timed_completion", 0) + completion
+        stats["seconds"] = round(stats["seconds"] + response.get("latency", 0), 3)
+    write_atomic(history_json, json.dumps(stats))
+
+
+def record_crowdin(seconds: float):
+    """Count time spent on the Crowdin requests a translated string makes (checking, uploading)"""
+    stats = json.loads(history_json.read_text())
+    stats["crowdin_seconds"] = round(stats.get("crowdin_seconds", 0) + seconds, 3)
+    write_atomic(history_json, json.dumps(stats))
+
+
+async def upload(client: CrowdinAPI, project_id: int, string_id: int, language_id: str, text: str):
+    start = perf_counter()
+    try:
+        return await client.upload_translation(project_id, string_id, language_id, text)
+    finally:
+        record_crowdin(perf_counter() - start)
+
+
+def record_string(source_text: str):
+    """Count a string sent to the model, so the estimator knows the calls and tokens per string"""
+    stats = json.loads(history_json.read_text())
+    stats["strings"] += 1
+    stats["source"] += count_tokens(source_text)
+    write_atomic(history_json, json.dumps(stats))
 
 
 def get_cost() -> float:
-    usage = json.loads(tokens_json.read_text())
+    return cost_of(json.loads(tokens_json.read_text()))
+
+
+def cost_of(usage: dict) -> float:
     input_price, output_price = PRICES[MODEL]
     input_cost = (usage["prompt"] / 1000) * input_price
     output_cost = (usage["completion"] / 1000) * output_price
     return round(input_cost + output_cost, 3)
 
 
-@cached(ttl=120)
-async def call_openai(
+def correction_prompt(name: str) -> str:
+    return load_prompt(correction_prompt_dir / name)
+
+
+def in_shard(project_id: int, language_id: str) -> bool:
+    """Whether this process is responsible for a (project, language) pair"""
+    if not coordination:
+        return True
+    return shard_of(project_id, language_id, SHARD_COUNT) == SHARD_INDEX
+
+
+def completion_kwargs(
     messages: t.List[dict],
     use_functions: bool,
-    temperature: float = 0.0,
-    presence_penalty: float = -0.3,
-    frequency_penalty: float = -0.3,
-):
+    temperature: float,
+    presence_penalty: float,
+    frequency_penalty: float,
+) -> dict:
     kwargs = {
-        "api_key": OPENAI_KEY,
         "api_base": ENDPOINT_OVERRIDE,
         "model": MODEL,
         "messages": messages,
@@ -108,76 +208,326 @@ async def call_openai(
     }
     if use_functions:
         kwargs["functions"] = [TRANSLATE]
-    return await openai.ChatCompletion.acreate(**kwargs)
+    return kwargs
+
+
+def get_cached(kwargs: dict) -> t.Tuple[str, t.Optional[dict]]:
+    key = cache_key(**kwargs)
+    response = response_cache.get(key)
+    if response:
+        # Replayed completions are free, flag them so they aren't counted again
+        response["cached"] = True
+    return key, response
+
+
+def openai_error():
+    """The openai.error module, imported on first use since openai is slow to import"""
+    from openai import error
+
+    return error
+
+
+async def call_openai(
+    messages: t.List[dict],
+    use_functions: bool,
+    temperature: float = 0.0,
+    presence_penalty: float = -0.3,
+    frequency_penalty: float = -0.3,
+):
+    kwargs = completion_kwargs(
+        messages, use_functions, temperature, presence_penalty, frequency_penalty
+    )
+    key, response = get_cached(kwargs)
+    if response:
+        return response
+    import openai
+
+    start = perf_counter()
+    response = await openai.ChatCompletion.acreate(api_key=OPENAI_KEY, **kwargs)
+    response["latency"] = perf_counter() - start
+    response_cache.set(key, response)
+    return response
+
+
+async def stream_openai(
+    messages: t.List[dict],
+    use_functions: bool,
+    validator: StreamValidator,
+    temperature: float = 0.0,
+    presence_penalty: float = -0.3,
+    frequency_penalty: float = -0.3,
+) -> dict:
+    """Stream a completion, cancelling it as soon as the validator rejects the reply
+
+    Returns a response shaped like a regular completion, with `cancel_reason` set if it was cut short
+    """
+    kwargs = completion_kwargs(
+        messages, use_functions, temperature, presence_penalty, frequency_penalty
+    )
+    key, response = get_cached(kwargs)
+    if response:
+        return response
+    import openai
+
+    start = perf_counter()
+    stream = await openai.ChatCompletion.acreate(api_key=OPENAI_KEY, stream=True, **kwargs)
+    message, reason = await consume_stream(stream, validator)
+    latency = perf_counter() - start
+
+    # Streamed completions don't report usage, so count it locally
+    prompt_tokens = count_message_tokens(messages)
+    completion_tokens = count_message_tokens([message]) - count_message_tokens([])
+    response = {
+        "choices": [{"message": message, "finish_reason": "cancelled" if reason else "stop"}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+        "cancel_reason": reason,
+        "latency": latency,
+    }
+    if not reason:
+        response_cache.set(key, response)
+    return response
 
 
 async def process_translations():
-    processed = json.loads(processed_json.read_text())
-    processed_qa = json.loads(processed_qa_json.read_text())
+    init_data()
+    client = CrowdinAPI(api_key=CROWDIN_KEY, max_concurrency=CROWDIN_CONCURRENCY)
+    try:
+        if PROCESS_QA:
+            await process_qa(client)
+        else:
+            await process_jobs(client)
+    finally:
+        await client.close()
+    print(cyan(response_cache.summary()))
+
 
-    client = CrowdinAPI(api_key=CROWDIN_KEY)
+async def process_qa(client: CrowdinAPI):
+    processed_qa = json.loads(processed_qa_json.read_text())
     projects = await client.get_projects()
     if not projects:
         print(red("There are no projects to process!!!"))
         return
     for project in projects:
         strings = await client.get_strings(project.id)
-        issues = await client.get_qa_issues(project.id) if PROCESS_QA else []
+        issues = await client.get_qa_issues(project.id)
         mapped_strings = {string.id: string for string in strings}
         mapped_langs = {lang.id: lang for lang in project.targetLanguages}
-        if PROCESS_QA:
-            for issue in issues:
-                key = f"{project.id}-{issue.id}"
-                string = mapped_strings.get(issue.stringId)
-                if not string:
-                    processed_qa.append(key)
-                    processed_qa_json.write_text(json.dumps(processed_qa))
-                    print(yellow(f"Added {key} to processed QA for no key"))
-                    continue
-                translation = await client.get_translation(project.id, string.id, issue.languageId)
-                if not translation:
-                    processed_qa.append(key)
-                    processed_qa_json.write_text(json.dumps(processed_qa))
-                    print(yellow(f"Added {key} to processed QA for no translation"))
-                    continue
-                lang = mapped_langs[issue.languageId]
-                success = await process_revision(client, project, lang, string, translation)
-                if not success:
-                    continue
+        for issue in issues:
+            if shutdown.is_set():
+                return
+            if not in_shard(project.id, issue.languageId):
+                continue
+            key = f"{project.id}-{issue.id}"
+            string = mapped_strings.get(issue.stringId)
+            if not string:
                 processed_qa.append(key)
-                processed_qa_json.write_text(json.dumps(processed_qa))
-                cost = get_cost()
-                print(f"{yellow('-')}-" * 22 + f" Usage: ${cost} " + f"{yellow('-')}-" * 22)
-        else:
-            print(yellow(f"Found {len(strings)} strings for project '{project.name}'"))
-            for lang in project.targetLanguages:
-                for string in strings:
-                    key = f"{project.id}-{string.id}-{lang.id}"
-                    if key in processed:
-                        continue
-                    if await client.get_translation(project.id, string.id, lang.id):
-                        processed.append(key)
-                        processed_json.write_text(json.dumps(processed))
-                        print(yellow(f"Added {key} to processed"))
-                        continue
-                    print(cyan(f"Processing {key}"))
-                    success = await process_translation(client, project, lang, string)
-                    if not success:
-                        continue
-                    processed.append(key)
-                    processed_json.write_text(json.dumps(processed))
-                    cost = get_cost()
-                    print(f"{yellow('-')}-" * 22 + f" Usage: ${cost} " + f"{yellow('-')}-" * 22)
+                write_atomic(processed_qa_json, json.dumps(processed_qa))
+                print(yellow(f"Added {key} to processed QA for no key"))
+                continue
+            translation = await client.get_translation(project.id, string.id, issue.languageId)
+            if not translation:
+                processed_qa.append(key)
+                write_atomic(processed_qa_json, json.dumps(processed_qa))
+                print(yellow(f"Added {key} to processed QA for no translation"))
+                continue
+            lang = mapped_langs[issue.languageId]
+            success = await process_revision(client, project, lang, string, translation)
+            if not success:
+                continue
+            processed_qa.append(key)
+            write_atomic(processed_qa_json, json.dumps(processed_qa))
+            cost = get_cost()
+            print(f"{yellow('-')}-" * 22 + f" Usage: ${cost} " + f"{yellow('-')}-" * 22)
+
+
+def plain_strings(project: Project, strings: t.List[StringRecord]) -> t.List[StringRecord]:
+    """Drop plural strings, their text is a dict of plural forms which isn't supported yet"""
+    plain = [string for string in strings if isinstance(string.text, str)]
+    if skipped := len(strings) - len(plain):
+        print(yellow(f"Skipping {skipped} plural strings in project '{project.name}'"))
+    return plain
+
+
+async def discover_jobs(client: CrowdinAPI) -> t.List[Job]:
+    """Scan Crowdin for strings that haven't been processed yet"""
+    processed = set(json.loads(processed_json.read_text()))
+    if coordination:
+        processed |= coordination.done_keys()
+    projects = await client.get_projects()
+    if not projects:
+        print(red("There are no projects to process!!!"))
+        return []
+    # Fetch all projects at once, the client throttles itself to what Crowdin tolerates
+    project_strings = await asyncio.gather(*(client.get_strings(i.id) for i in projects))
+    jobs = []
+    for project, strings in zip(projects, project_strings):
+        print(yellow(f"Found {len(strings)} strings for project '{project.name}'"))
+        strings = plain_strings(project, strings)
+        for lang in project.targetLanguages:
+            if not in_shard(project.id, lang.id):
+                continue
+            for string in strings:
+                job = Job(project, lang, string)
+                if job.key not in processed:
+                    jobs.append(job)
+    return jobs
+
+
+async def process_jobs(client: CrowdinAPI):
+    if checkpoint.exists():
+        # Checkpoints from older versions can still hold plural strings
+        jobs = [job for job in checkpoint.load() if isinstance(job.string.text, str)]
+        spent = cost_of(checkpoint.usage)
+        print(yellow(f"Resuming {len(jobs)} jobs from checkpoint, ${spent} spent on this run so far"))
+    else:
+        jobs = await discover_jobs(client)
+        checkpoint.start(jobs)
+        print(yellow(f"Queued {len(jobs)} jobs"))
+    await load_glossary(glossary, client, GLOSSARY, glossary_path)
+
+    queue = asyncio.Queue()
+    items = group_jobs(jobs, BATCH_TOKENS, BATCH_SIZE) if BATCH else jobs
+    for item in items:
+        queue.put_nowait(item)
+    workers = max(WORKERS, 1)
+    for _ in range(workers):
+        queue.put_nowait(None)
+    processed = ProcessedKeys(processed_json)
+    await asyncio.gather(*(translation_worker(client, queue, processed) for _ in range(workers)))
+
+    spent = cost_of(checkpoint.usage)
+    if shutdown.is_set():
+        print(yellow(f"Stopped early, progress saved to checkpoint (${spent} spent on this run)"))
+        return
+    print(cyan(f"Run complete, ${spent} spent including resumed sessions"))
+    checkpoint.clear()
+
+
+async def translation_worker(
+    client: CrowdinAPI,
+    queue: asyncio.Queue,
+    processed: ProcessedKeys,
+    on_done: t.Optional[t.Callable[[Job], None]] = None,
+):
+    """Process jobs from the queue until a None sentinel is received or a shutdown is requested
+
+    Queue items are either a single job or a group of related jobs to translate together
+    """
+    while not shutdown.is_set():
+        item: t.Union[Job, t.List[Job], None] = await queue.get()
+        if item is None:
+            return
+        jobs = item if isinstance(item, list) else [item]
+        interrupted = False
+        completed = False
+        try:
+            if len(jobs) > 1:
+                interrupted = await run_batch(client, jobs, processed)
+            else:
+                interrupted = await run_job(client, jobs[0], processed)
+            completed = True
+        except Exception as e:
+            # Leave the jobs in the checkpoint so they are retried, one bad job shouldn't stop the worker
+            print(red(f"Failed to process {', '.join(job.key for job in jobs)}: {e!r}"))
+        finally:
+            if coordination and (interrupted or not completed):
+                # Let other shards take over jobs that were claimed but not finished
+                for job in jobs:
+                    coordination.release(job.key)
+            if on_done:
+                for job in jobs:
+                    on_done(job)
+        if interrupted:
+            return
+
+
+async def claim_job(client: CrowdinAPI, job: Job, processed: ProcessedKeys) -> bool:
+    """Return True if the job still needs translating"""
+    key = job.key
+    if coordination and not coordination.claim(key, job.string.revision):
+        print(yellow(f"Skipping {key}, another shard has it"))
+        checkpoint.finish(key)
+        return False
+    start = perf_counter()
+    if await client.get_translation(job.project.id, job.string.id, job.language.id):
+        if key not in processed:
+            print(yellow(f"Added {key} to processed"))
+        finish_job(job, True, processed)
+        return False
+    # Only strings that go on to be translated count towards the estimator's overhead per string
+    record_crowdin(perf_counter() - start)
+    return True
+
+
+def finish_job(job: Job, success: bool, processed: ProcessedKeys):
+    key = job.key
+    checkpoint.finish(key)
+    if coordination:
+        coordination.finish(key, success)
+    if success:
+        processed.add(key)
+
+
+async def run_job(client: CrowdinAPI, job: Job, processed: ProcessedKeys) -> bool:
+    """Translate a single job, return True if it was interrupted by a shutdown"""
+    if not await claim_job(client, job, processed):
+        return False
+    record_string(job.string.text)
+    return await translate_job(client, job, processed)
+
+
+async def translate_job(client: CrowdinAPI, job: Job, processed: ProcessedKeys) -> bool:
+    print(cyan(f"Processing {job.key}"))
+    success = await process_translation(client, job.project, job.language, job.string)
+    if not success and shutdown.is_set():
+        # Interrupted mid conversation, leave it in the checkpoint to resume later
+        return True
+    finish_job(job, bool(success), processed)
+    if success:
+        cost = get_cost()
+        print(f"{yellow('-')}-" * 22 + f" Usage: ${cost} " + f"{yellow('-')}-" * 22)
+    return False
+
+
+async def run_batch(client: CrowdinAPI, jobs: t.List[Job], processed: ProcessedKeys) -> bool:
+    """Translate a group of related jobs in one call, falling back to one by one for any that fail"""
+    pending = [job for job in jobs if await claim_job(client, job, processed)]
+    results = {}
+    if len(pending) > 1 and not shutdown.is_set():
+        print(cyan(f"Processing {len(pending)} strings from file {pending[0].string.fileId} together"))
+        for job in pending:
+            record_string(job.string.text)
+        results = await process_batch(client, pending)
+        cost = get_cost()
+        print(f"{yellow('-')}-" * 22 + f" Usage: ${cost} " + f"{yellow('-')}-" * 22)
+    elif len(pending) == 1:
+        record_string(pending[0].string.text)
+
+    for job in pending:
+        if job.key in results:
+            finish_job(job, results[job.key], processed)
+            continue
+        if shutdown.is_set():
+            return True
+        if await translate_job(client, job, processed):
+            return True
+    return False
 
 
 async def process_revision(
     client: CrowdinAPI,
     project: Project,
     language: Language,
-    string: String,
+    string: StringRecord,
     translation: Translation,
     issue: QA,
 ):
+    openai_errors = openai_error()
+
     messages = [
         {"role": "user", "content": f"Translate the following text to {language.name}"},
         {"role": "user", "content": string.text},
@@ -198,27 +548,27 @@ async def process_revision(
         try:
             response = await call_openai(messages, use_functions=False)
             update_tokens(response)
-        except ServiceUnavailableError as e:
+        except openai_errors.ServiceUnavailableError as e:
             openai_fails += 1
             print(red(f"ServiceUnavailableError, waiting 5 seconds before trying again: {e}"))
-            sleep(5)
+            await asyncio.sleep(5)
             print("Trying again...")
             continue
-        except (APIConnectionError, APIError) as e:
+        except (openai_errors.APIConnectionError, openai_errors.APIError) as e:
             openai_fails += 1
             print(red(f"APIConnectionError/APIError, waiting 5 seconds before trying again: {e}"))
-            sleep(5)
+            await asyncio.sleep(5)
             print("Trying again...")
             continue
-        except RateLimitError as e:
+        except openai_errors.RateLimitError as e:
             openai_fails += 1
             print(red(f"Rate limted! Waiting 1 minute before retrying: {e}"))
-            sleep(60)
+            await asyncio.sleep(60)
             continue
         except Exception:
             openai_fails += 1
             print(red(f"EXCEPTION\n{json.dumps(messages, indent=2)}"))
-            sleep(60)
+            await asyncio.sleep(60)
             continue
 
         message = response["choices"][0]["message"]
@@ -257,27 +607,142 @@ async def process_revision(
     return success
 
 
-async def process_translation(
-    client: CrowdinAPI, project: Project, language: Language, string: String
-) -> bool:
-    """Return True if successfully translated"""
-    translator = TranslateManager(deepl_key=DEEPL_KEY)
-    system_prompt_raw = system_prompt_path.read_text().strip()
+def build_messages(language: Language, source_text: str) -> t.List[dict]:
+    """System prompt and few-shot prefix followed by the string to translate"""
+    system_prompt_raw = load_prompt(system_prompt_path).strip()
     system_prompt = system_prompt_raw.replace("{target_language}", language.name)
-
-    source_text = string.text
+    messages = [{"role": "system", "content": system_prompt}]
+    for source, translation in FEW_SHOT:
+        messages.append({"role": "user", "content": source})
+        messages.append({"role": "assistant", "content": translation})
+    if terms := glossary.lookup(source_text, language.id):
+        messages.append({"role": "system", "content": glossary_prompt(terms)})
+    messages.append({"role": "user", "content": source_text})
+    return messages
+
+
+def build_batch_messages(language: Language, strings: t.List[StringRecord]) -> t.List[dict]:
+    """Same prefix as a single string, with the few-shot examples and strings as numbered JSON"""
+    system_prompt_raw = load_prompt(system_prompt_path).strip()
+    system_prompt = system_prompt_raw.replace("{target_language}", language.name)
+    example = {str(idx): pair[0] for idx, pair in enumerate(FEW_SHOT, start=1)}
+    example_reply = {str(idx): pair[1] for idx, pair in enumerate(FEW_SHOT, start=1)}
+    items = {}
+    for idx, string in enumerate(strings, start=1):
+        item = {"text": string.text}
+        if string.context:
+            item["context"] = string.context[:200]
+        items[str(idx)] = item
     messages = [
         {"role": "system", "content": system_prompt},
-        {"role": "user", "content": "Hello, how are you?"},
-        {"role": "assistant", "content": "¿Hola, cómo estás?"},
-        {"role": "user", "content": "{}\nCog Version: {}\nAuthor: {}"},
-        {"role": "assistant", "content": "{}\nVersión de Cog: {}\nAutor: {}"},
-        {"role": "user", "content": "Invalid schema!\n**Missing**\n{}"},
-        {"role": "assistant", "content": "Geçersiz şema!\n**Eksik**\n{}"},
-        {"role": "user", "content": source_text},
+        {"role": "system", "content": load_prompt(batch_prompt_path).strip()},
+        {"role": "user", "content": json.dumps(example, ensure_ascii=False)},
+        {"role": "assistant", "content": json.dumps(example_reply, ensure_ascii=False)},
     ]
+    terms = {}
+    for string in strings:
+        terms.update(glossary.lookup(string.text, language.id))
+    if terms:
+        messages.append({"role": "system", "content": glossary_prompt(sorted(terms.items()))})
+    messages.append({"role": "user", "content": json.dumps(items, ensure_ascii=False, indent=2)})
+    return messages
+
+
+def parse_batch_reply(reply: t.Optional[str]) -> dict:
+    """Pull the JSON object out of a batch reply, ignoring any code fences around it"""
+    if not reply or "{" not in reply:
+        return {}
+    try:
+        data = json.loads(reply[reply.index("{") : reply.rindex("}") + 1])
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def upload_error(data: dict) -> t.Optional[str]:
+    if not data or not data.get("errors"):
+        return
+    return data["errors"][0]["error"]["errors"][0]["message"]
+
+
+async def process_batch(client: CrowdinAPI, jobs: t.List[Job]) -> t.Dict[str, bool]:
+    """Translate related strings in one conversation
+
+    Returns whether each handled job was uploaded, jobs missing from the result
+    need to be translated on their own (ex: placeholder mismatch or upload error)
+    """
+    openai_errors = openai_error()
+
+    language = jobs[0].language
+    messages = build_batch_messages(language, [job.string for job in jobs])
+    try:
+        response = await call_openai(messages, use_functions=False)
+        update_tokens(response)
+        record_call(response)
+    except openai_errors.OpenAIError as e:
+        print(red(f"Batch translation failed, translating one by one: {e}"))
+        return {}
+
+    translations = parse_batch_reply(response["choices"][0]["message"]["content"])
+    results = {}
+    for idx, job in enumerate(jobs, start=1):
+        source = job.string.text
+        reply = translations.get(str(idx))
+        if not isinstance(reply, str) or not reply.strip():
+            continue
+        reply = static_processing(source, reply)
+        if source.count("{") != reply.count("{") or source.count("`") != reply.count("`"):
+            # The single string flow has the correction prompts for these
+            continue
+
+        print("-" * 45 + " Source " + "-" * 45)
+        print(f"{cyan(source)}\n")
+        print("-" * 45 + f" {language.name} " + "-" * 45)
+        print(f"{green(reply)}\n")
+        print("-" * 100)
+        if not AUTO:
+            txt = (
+                "Does this look okay?\n"
+                "- Type 'y' to continue\n"
+                "- Type 'n' or press ENTER to skip\n"
+                "Enter your response: "
+            )
+            confirmation = input(yellow(txt))
+            if "y" not in confirmation.lower():
+                print("Skipping...")
+                results[job.key] = False
+                continue
+
+        print(yellow("Uploading..."))
+        status, data = await upload(client, job.project.id, job.string.id, language.id, reply)
+        if status == 201:
+            print(green("Translation upload successful"))
+            results[job.key] = True
+            continue
+        error = upload_error(data)
+        if error and "An identical translation" in error:
+            print("Skipping, identical translation exists")
+            results[job.key] = False
+            continue
+        print(red(f"Translation upload unsuccessful (status {status}), retrying on its own"))
+    return results
+
 
-    if PRE_TRANSLATE:
+async def process_translation(
+    client: CrowdinAPI, project: Project, language: Language, string: StringRecord
+) -> bool:
+    """Return True if successfully translated"""
+    openai_errors = openai_error()
+
+    source_text = string.text
+    messages = build_messages(language, source_text)
+
+    key = f"{project.id}-{string.id}-{language.id}"
+    resumed = checkpoint.load_conversation(key)
+    if resumed:
+        print(yellow(f"Resuming conversation for {key}"))
+        messages = resumed
+    elif PRE_TRANSLATE:
         if translation := await translator.translate(source_text, language.name):
             if translation.text.strip() != source_text.strip():
                 name = "get_translation"
@@ -286,6 +751,14 @@ async def process_translation(
                 messages.append({"role": "assistant", "content": None, "function_call": call})
                 messages.append({"role": "function", "name": name, "content": translation.text})
 
+    validator = StreamValidator(source_text, language.twoLettersCode)
+    cancel_corrections = {
+        "placeholder": correction_prompt("placeholder_mismatch"),
+        "backtick": correction_prompt("backtick_mismatch"),
+        "length": correction_prompt("length_difference"),
+        "script": correction_prompt("script_mismatch").replace("{target_language}", language.name),
+    }
+
     functions_called = 0
     corrections = 0
     use_functions = True
@@ -298,36 +771,51 @@ async def process_translation(
         if openai_fails > 2 or translation_fails > 3 or corrections > 4:
             print("Failed to translate, skipping")
             return
+        checkpoint.save_conversation(key, messages)
+        if shutdown.is_set():
+            print(yellow(f"Shutting down, saved conversation for {key}"))
+            return
         try:
             if functions_called > 6:
                 use_functions = False
-            response = await call_openai(messages, use_functions)
+            if STREAM:
+                response = await stream_openai(messages, use_functions, validator)
+            else:
+                response = await call_openai(messages, use_functions)
             update_tokens(response)
-        except ServiceUnavailableError as e:
+            record_call(response)
+        except openai_errors.ServiceUnavailableError as e:
             openai_fails += 1
             print(red(f"ServiceUnavailableError, waiting 5 seconds before trying again: {e}"))
-            sleep(5)
+            await asyncio.sleep(5)
             print("Trying again...")
             continue
-        except (APIConnectionError, APIError) as e:
+        except (openai_errors.APIConnectionError, openai_errors.APIError) as e:
             openai_fails += 1
             print(red(f"APIConnectionError/APIError, waiting 5 seconds before trying again: {e}"))
-            sleep(5)
+            await asyncio.sleep(5)
             print("Trying again...")
             continue
-        except RateLimitError as e:
+        except openai_errors.RateLimitError as e:
             openai_fails += 1
             print(red(f"Rate limted! Waiting 1 minute before retrying: {e}"))
-            sleep(60)
+            await asyncio.sleep(60)
             continue
         except Exception:
             openai_fails += 1
             print(red(f"EXCEPTION\n{json.dumps(messages, indent=2)}"))
-            sleep(60)
+            await asyncio.sleep(60)
             continue
 
         message = response["choices"][0]["message"]
 
+        if reason := response.get("cancel_reason"):
+            print(red(f"Cancelled reply early ({reason} check failed)"))
+            messages.append(message)
+            messages.append({"role": "system", "content": cancel_corrections[reason]})
+            corrections += 1
+            continue
+
         reply: t.Optional[str] = message["content"]
         if reply:
             reply = reply.replace(r"\n", "\n")
@@ -355,7 +843,7 @@ async def process_translation(
                 if corrections > 3:
                     review = True
                 else:
-                    messages.append({"role": "system", "content": PLACEHOLDER_MISMATCH})
+                    messages.append({"role": "system", "content": correction_prompt("placeholder_mismatch")})
                     corrections += 1
                     continue
             if string.text.count("`") != reply.count("`"):
@@ -363,7 +851,7 @@ async def process_translation(
                 if corrections > 3:
                     review = True
                 else:
-                    messages.append({"role": "system", "content": BACKTICK_MISMATCH})
+                    messages.append({"role": "system", "content": correction_prompt("backtick_mismatch")})
                     corrections += 1
                     continue
 
@@ -380,9 +868,7 @@ async def process_translation(
                     break
 
             print(yellow("Uploading..."))
-            status, data = await client.upload_translation(
-                project.id, string.id, language.id, reply
-            )
+            status, data = await upload(client, project.id, string.id, language.id, reply)
             if status == 201:
                 success = True
                 print(green("Translation upload successful"))
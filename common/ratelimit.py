@@ -0,0 +1,67 @@
+import asyncio
+import random
+import time
+import typing as t
+
+
+class AdaptiveLimiter:
+    """Concurrency limiter that finds the highest rate an API tolerates (AIMD)
+
+    The limit grows by roughly one slot per round of successful requests and is
+    halved whenever the API is congested (throttled, 5xx or timing out), like TCP
+    congestion control.
+    """
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 20):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self.condition = asyncio.Condition()
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+
+    async def acquire(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        if (delay := self.paused_until - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+
+    async def release(self, congested: bool = False):
+        async with self.condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if congested:
+                # Requests that were already in flight when it happened count as one event
+                if now - self.last_decrease > 1:
+                    self.limit = max(self.minimum, self.limit / 2)
+                    self.last_decrease = now
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+    def pause(self, seconds: float):
+        """Hold off all new requests for a while, ex: when the API says to retry after N seconds"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+def backoff(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+def retry_after(headers: t.Mapping[str, str]) -> t.Optional[float]:
+    """Seconds to wait according to the rate limit headers of a response, if any"""
+    if value := headers.get("Retry-After"):
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return None
+    if headers.get("X-RateLimit-Remaining") == "0" and (reset := headers.get("X-RateLimit-Reset")):
+        try:
+            reset = float(reset)
+        except ValueError:
+            return None
+        # Reset can either be a unix timestamp or a number of seconds
+        return max(0.0, reset - time.time()) if reset > 1e9 else reset
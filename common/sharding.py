@@ -0,0 +1,143 @@
+import asyncio
+import os
+import sqlite3
+import sys
+import time
+import typing as t
+import zlib
+from pathlib import Path
+
+# Claims older than this are considered abandoned (ex: the shard crashed) and can be taken over
+CLAIM_LEASE = 60 * 60
+
+
+def shard_of(project_id: int, language_id: str, count: int) -> int:
+    """Deterministically assign a (project, language) pair to a shard
+
+    crc32 is used over hash() since it's stable across processes and hosts
+    """
+    return zlib.crc32(f"{project_id}-{language_id}".encode()) % count
+
+
+class CoordinationStore:
+    """SQLite store shared by the shards on one host to record progress and usage
+
+    SQLite locking isn't reliable over network filesystems, so keep it on a local disk and
+    don't share it between hosts. Shards on different hosts never get the same
+    (project, language) pair as long as they use the same SHARD_COUNT.
+    """
+
+    def __init__(self, path: Path, shard: int):
+        self.path = path
+        self.shard = shard
+        self.connection: t.Optional[sqlite3.Connection] = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        """Connect on first use so creating the store doesn't touch the disk"""
+        if self.connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs "
+                "(key TEXT PRIMARY KEY, shard INTEGER, status TEXT, updated REAL, revision INTEGER)"
+            )
+            columns = {i[1] for i in self.connection.execute("PRAGMA table_info(jobs)")}
+            if "revision" not in columns:
+                # Stores created before revisions were tracked
+                self.connection.execute("ALTER TABLE jobs ADD COLUMN revision INTEGER")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS usage "
+                "(shard INTEGER PRIMARY KEY, total INTEGER, prompt INTEGER, completion INTEGER)"
+            )
+        return self.connection
+
+    def claim(self, key: str, revision: t.Optional[int] = None) -> bool:
+        """Claim a job for this shard, return False if another shard has it or it's done
+
+        A job that is done can be claimed again once its string has been edited to a new revision
+        """
+        now = time.time()
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.db.execute(
+                "SELECT shard, status, updated, revision FROM jobs WHERE key = ?", (key,)
+            ).fetchone()
+            if row:
+                shard, status, updated, done_revision = row
+                if status == "done" and (revision is None or revision == done_revision):
+                    return False
+                if status == "claimed" and shard != self.shard and now - updated < CLAIM_LEASE:
+                    return False
+            self.db.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, 'claimed', ?, ?)",
+                (key, self.shard, now, revision),
+            )
+            return True
+        finally:
+            self.db.execute("COMMIT")
+
+    def finish(self, key: str, success: bool):
+        status = "done" if success else "failed"
+        self.db.execute(
+            "UPDATE jobs SET status = ?, updated = ? WHERE key = ? AND shard = ?",
+            (status, time.time(), key, self.shard),
+        )
+
+    def release(self, key: str):
+        """Give up a claim that wasn't finished, ex: interrupted by a shutdown"""
+        self.db.execute(
+            "UPDATE jobs SET status = 'failed', updated = ? "
+            "WHERE key = ? AND shard = ? AND status = 'claimed'",
+            (time.time(), key, self.shard),
+        )
+
+    def done_keys(self) -> t.Set[str]:
+        return {i[0] for i in self.db.execute("SELECT key FROM jobs WHERE status = 'done'")}
+
+    def add_usage(self, usage: dict):
+        self.db.execute(
+            "INSERT INTO usage VALUES (?, ?, ?, ?) ON CONFLICT(shard) DO UPDATE SET "
+            "total = total + excluded.total, "
+            "prompt = prompt + excluded.prompt, "
+            "completion = completion + excluded.completion",
+            (
+                self.shard,
+                usage.get("total_tokens", 0),
+                usage.get("prompt_tokens", 0),
+                usage.get("completion_tokens", 0),
+            ),
+        )
+
+    def total_usage(self) -> dict:
+        row = self.db.execute(
+            "SELECT COALESCE(SUM(total), 0), COALESCE(SUM(prompt), 0), "
+            "COALESCE(SUM(completion), 0) FROM usage"
+        ).fetchone()
+        return {"total": row[0], "prompt": row[1], "completion": row[2]}
+
+
+async def launch_shards(
+    count: int,
+    data_dir: Path,
+    coordination_db: Path,
+    webhook_port: int = 0,
+) -> int:
+    """Run one worker process per shard on this host, each with its own data dir
+
+    In watch mode every shard runs its own webhook listener, on webhook_port + its index
+
+    Returns the highest exit code of the shards
+    """
+    procs = []
+    script = Path(sys.argv[0]).resolve()
+    for index in range(count):
+        env = os.environ.copy()
+        env["SHARD_INDEX"] = str(index)
+        env["DATA_DIR"] = str(data_dir / f"shard-{index}")
+        env["COORDINATION_DB"] = str(coordination_db)
+        if webhook_port:
+            env["WEBHOOK_PORT"] = str(webhook_port + index)
+        procs.append(await asyncio.create_subprocess_exec(sys.executable, script, env=env))
+    codes = await asyncio.gather(*(proc.wait() for proc in procs))
+    return max(codes)
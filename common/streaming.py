@@ -0,0 +1,98 @@
+import re
+import typing as t
+import unicodedata
+
+from common.constants import SCRIPTS
+
+# Replies longer than (source * RUNAWAY_RATIO + RUNAWAY_SLACK) characters are cancelled
+RUNAWAY_RATIO = 3
+RUNAWAY_SLACK = 40
+# Minimum amount of letters before the script of a reply is judged
+SCRIPT_MIN_LETTERS = 24
+# Fraction of letters that must be written in the expected script
+SCRIPT_MIN_RATIO = 0.25
+
+# Text that is expected to stay untranslated (placeholders, code, tags)
+UNTRANSLATED = re.compile(r"\{[^{}]*\}?|`[^`]*`?|<[^<>]*>?")
+
+
+def script_of(char: str) -> t.Optional[str]:
+    """Return the unicode script name of a letter, ex: LATIN, CYRILLIC, CJK"""
+    try:
+        return unicodedata.name(char).split()[0]
+    except ValueError:
+        return None
+
+
+class StreamValidator:
+    """Cheap checks ran against a reply while it is still being generated
+
+    Each check only looks at things that can't recover once they go wrong,
+    so a failed check means the rest of the completion is wasted tokens.
+    """
+
+    def __init__(self, source: str, language_code: t.Optional[str] = None):
+        self.source = source
+        self.placeholders = source.count("{")
+        self.backticks = source.count("`")
+        self.max_length = len(source) * RUNAWAY_RATIO + RUNAWAY_SLACK
+        self.scripts = SCRIPTS.get((language_code or "").lower())
+        # Don't judge the script if the source itself has no letters to translate
+        letters = [c for c in UNTRANSLATED.sub("", source) if c.isalpha()]
+        if len(letters) < SCRIPT_MIN_LETTERS // 2:
+            self.scripts = None
+
+    def check(self, text: str) -> t.Optional[str]:
+        """Return the reason to cancel the stream, or None if the reply looks fine so far"""
+        if text.count("{") > self.placeholders:
+            return "placeholder"
+        if text.count("`") > self.backticks:
+            return "backtick"
+        if len(text) > self.max_length:
+            return "length"
+        if self.scripts and not self.script_ok(text):
+            return "script"
+
+    def script_ok(self, text: str) -> bool:
+        letters = [c for c in UNTRANSLATED.sub("", text) if c.isalpha()]
+        if len(letters) < SCRIPT_MIN_LETTERS:
+            return True
+        matching = sum(1 for c in letters if script_of(c) in self.scripts)
+        return matching / len(letters) >= SCRIPT_MIN_RATIO
+
+
+async def consume_stream(
+    stream: t.AsyncIterator[dict],
+    validator: StreamValidator,
+) -> t.Tuple[dict, t.Optional[str]]:
+    """Build a chat message from streamed chunks, stopping early if validation fails
+
+    Returns the (possibly partial) assistant message and the reason it was cancelled
+    """
+    content = ""
+    function_name = ""
+    arguments = ""
+    reason = None
+    async for chunk in stream:
+        if not chunk["choices"]:
+            continue
+        delta = chunk["choices"][0].get("delta", {})
+        if function_call := delta.get("function_call"):
+            function_name += function_call.get("name") or ""
+            arguments += function_call.get("arguments") or ""
+            continue
+        if not delta.get("content"):
+            continue
+        content += delta["content"]
+        # Escaped newlines are unescaped before uploading, so validate what will be uploaded
+        if reason := validator.check(content.replace(r"\n", "\n")):
+            break
+
+    if hasattr(stream, "aclose"):
+        # Closing the generator drops the connection, which stops the generation server side
+        await stream.aclose()
+
+    message = {"role": "assistant", "content": content or None}
+    if function_name:
+        message["function_call"] = {"name": function_name, "arguments": arguments}
+    return message, reason
@@ -0,0 +1,43 @@
+import functools
+import typing as t
+
+from common import MODEL
+
+# Tokens the chat format adds around every message, and to prime the reply
+TOKENS_PER_MESSAGE = 4
+REPLY_PRIMING = 2
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding():
+    """tiktoken encoding for the configured model, or None if tiktoken isn't installed"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(MODEL)
+    except KeyError:
+        # Unknown/self-hosted models, this is close enough for estimates
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: t.Optional[str]) -> int:
+    if not text:
+        return 0
+    if encoding := get_encoding():
+        return len(encoding.encode(text))
+    # Roughly 4 characters per token for English text
+    return max(1, round(len(text) / 4))
+
+
+def count_message_tokens(messages: t.List[dict]) -> int:
+    tokens = REPLY_PRIMING
+    for message in messages:
+        tokens += TOKENS_PER_MESSAGE
+        tokens += count_tokens(message.get("content"))
+        tokens += count_tokens(message.get("name"))
+        if function_call := message.get("function_call"):
+            tokens += count_tokens(function_call.get("name"))
+            tokens += count_tokens(function_call.get("arguments"))
+    return tokens
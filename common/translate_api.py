@@ -1,15 +1,16 @@
 import asyncio
 import typing as t
 
-import deepl
-import googletrans
 from aiohttp import (
     ClientConnectorError,
     ClientResponseError,
     ClientSession,
     ClientTimeout,
 )
-from httpx import ReadTimeout
+
+# Providers are slow to import, so they're only loaded when a translation is needed
+if t.TYPE_CHECKING:
+    import deepl
 
 
 class Result:
@@ -25,6 +26,10 @@ class Result:
 class TranslateManager:
     def __init__(self, deepl_key: t.Optional[str] = None):
         self.deepl_key = deepl_key
+        # Language lookups hit the DeepL API, so resolved codes are kept for the life of the manager
+        self.languages: t.Dict[str, t.Optional[str]] = {}
+        self.deepl_languages: t.Optional[list] = None
+        self.translator: t.Optional["deepl.Translator"] = None
 
     async def translate(
         self,
@@ -44,7 +49,22 @@ class TranslateManager:
                 res = await self.flowery(text, lang)
         return res
 
+    def get_deepl(self) -> "deepl.Translator":
+        import deepl
+
+        if self.translator is None:
+            self.translator = deepl.Translator(self.deepl_key, send_platform_info=False)
+        return self.translator
+
     def convert(self, language: str) -> t.Optional[str]:
+        key = language.lower()
+        if key not in self.languages:
+            self.languages[key] = self.resolve(language)
+        return self.languages[key]
+
+    def resolve(self, language: str) -> t.Optional[str]:
+        import googletrans
+
         if language.lower() == "chinese":
             language = "chinese (simplified)"
         elif self.deepl_key and language.lower() == "pt":
@@ -53,8 +73,9 @@ class TranslateManager:
             language = "PT-PT"
 
         if self.deepl_key:
-            translator = deepl.Translator(self.deepl_key, send_platform_info=False)
-            for lang_obj in translator.get_target_languages():
+            if self.deepl_languages is None:
+                self.deepl_languages = self.get_deepl().get_target_languages()
+            for lang_obj in self.deepl_languages:
                 if (
                     language.lower() == lang_obj.name.lower()
                     or language.lower() == lang_obj.code.lower()
@@ -71,7 +92,9 @@ class TranslateManager:
         target_lang: str,
         formality: t.Optional[str] = None,
     ) -> t.Optional[Result]:
-        translator = deepl.Translator(self.deepl_key, send_platform_info=False)
+        import deepl
+
+        translator = self.get_deepl()
         usage = await asyncio.to_thread(translator.get_usage)
         if usage.any_limit_reached:
             return
@@ -93,6 +116,9 @@ class TranslateManager:
         )
 
     async def google(self, text: str, target_lang: str) -> t.Optional[Result]:
+        import googletrans
+        from httpx import ReadTimeout
+
         translator = googletrans.Translator()
         try:
             res = await asyncio.to_thread(translator.translate, text, target_lang)
@@ -1,17 +1,88 @@
 import asyncio
+import signal
 
-from common import PROCESS_QA
-from common.constants import yellow
-from common.processing import process_translations
+from common import (
+    AUTO,
+    ESTIMATE,
+    PROCESS_QA,
+    SHARD_COUNT,
+    SHARD_INDEX,
+    WATCH,
+    WEBHOOK_PORT,
+    coordination_db,
+    data_dir,
+)
+from common.constants import cyan, red, yellow
+
+# Mode specific modules are imported when needed to keep startup fast
+
+
+def install_signal_handlers(loop: asyncio.AbstractEventLoop, shutdown: asyncio.Event):
+    """First signal drains the workers and flushes state, a second one stops immediately"""
+    signals = 0
+
+    def handler(signum, frame):
+        nonlocal signals
+        signals += 1
+        if signals > 1:
+            raise KeyboardInterrupt
+        print(yellow("\nFinishing in-flight work before stopping, press Ctrl-C again to stop now"))
+        loop.call_soon_threadsafe(shutdown.set)
+
+    # signal.signal is used over loop.add_signal_handler so Windows and input() prompts work too
+    signal.signal(signal.SIGINT, handler)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, handler)
+
+
+async def run_shards():
+    from common.processing import cost_of
+    from common.sharding import CoordinationStore, launch_shards
+
+    print(yellow(f"Launching {SHARD_COUNT} shards"))
+    if AUTO != 2:
+        print(red("Shards share this terminal, setting AUTO to 2 is recommended"))
+    if WATCH and WEBHOOK_PORT:
+        last = WEBHOOK_PORT + SHARD_COUNT - 1
+        print(yellow(f"Shards listen for Crowdin webhooks on ports {WEBHOOK_PORT}-{last}"))
+    code = await launch_shards(SHARD_COUNT, data_dir, coordination_db, WEBHOOK_PORT)
+    usage = CoordinationStore(coordination_db, -1).total_usage()
+    print(cyan(f"All shards finished (exit code {code}), total usage: ${cost_of(usage)}"))
 
 
 async def main():
+    loop = asyncio.get_running_loop()
+    if ESTIMATE:
+        from common.estimate import estimate_translations
+
+        print(yellow("ESTIMATE MODE"))
+        await estimate_translations()
+        return
+    if SHARD_COUNT > 1 and SHARD_INDEX < 0:
+        # The shards handle signals themselves, the launcher just waits for them
+        install_signal_handlers(loop, asyncio.Event())
+        await run_shards()
+        return
+
+    from common.processing import process_translations, shutdown
+
+    install_signal_handlers(loop, shutdown)
     if PROCESS_QA:
         print(yellow("QA MODE"))
+    elif WATCH:
+        from common.daemon import watch_translations
+
+        print(yellow("WATCH MODE"))
+        await watch_translations()
+        return
     else:
         print(yellow("TRANSLATE MODE"))
     await process_translations()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        # Progress is written as it happens, so the checkpoint is already up to date
+        print(red("Stopped, rerun to resume from the last checkpoint"))
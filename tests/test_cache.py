@@ -0,0 +1,75 @@
+import os
+
+from common.cache import ResponseCache, cache_key
+
+MESSAGES = [
+    {"role": "system", "content": "Translate"},
+    {"role": "assistant", "content": None, "function_call": {"name": "f", "arguments": '{"a": 1, "b": 2}'}},
+]
+
+
+def test_cache_key_ignores_irrelevant_differences():
+    key = cache_key("gpt", MESSAGES, temperature=0)
+    reordered = [
+        {"content": "Translate", "role": "system", "extra": "ignored"},
+        {"role": "assistant", "function_call": {"arguments": '{"b":2,"a":1}', "name": "f"}},
+    ]
+    assert cache_key("gpt", reordered, temperature=0, functions=None) == key
+
+
+def test_cache_key_changes_with_inputs():
+    key = cache_key("gpt", MESSAGES, temperature=0)
+    assert cache_key("other", MESSAGES, temperature=0) != key
+    assert cache_key("gpt", MESSAGES, temperature=0.5) != key
+    assert cache_key("gpt", MESSAGES[:1], temperature=0) != key
+
+
+def test_memory_tier_is_lru():
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", {"n": 1})
+    cache.set("b", {"n": 2})
+    assert cache.get("a") == {"n": 1}
+    cache.set("c", {"n": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"n": 1}
+    assert cache.get("c") == {"n": 3}
+
+
+def test_hits_are_copies():
+    cache = ResponseCache()
+    cache.set("a", {"n": 1})
+    cache.get("a")["n"] = 2
+    assert cache.get("a") == {"n": 1}
+
+
+def test_disk_tier_survives_restarts(tmp_path):
+    ResponseCache(directory=tmp_path).set("a", {"n": 1})
+    cache = ResponseCache(directory=tmp_path)
+    assert cache.get("a") == {"n": 1}
+    assert cache.stats["disk_hits"] == 1
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_corrupt_entries_are_dropped(tmp_path):
+    cache = ResponseCache(directory=tmp_path)
+    cache.set("a", {"n": 1})
+    cache.set("b", {"n": 2})
+    (tmp_path / "a.json").write_text('{"n": ')
+    cache = ResponseCache(directory=tmp_path)
+    assert cache.get("a") is None
+    assert not (tmp_path / "a.json").exists()
+    assert cache.disk_bytes == (tmp_path / "b.json").stat().st_size
+    assert cache.get("b") == {"n": 2}
+
+
+def test_prune_removes_least_recently_used(tmp_path):
+    cache = ResponseCache(max_entries=0, directory=tmp_path, max_disk_bytes=10**6)
+    for idx, key in enumerate("abc"):
+        cache.set(key, {"text": "x" * 100})
+        os.utime(tmp_path / f"{key}.json", (idx, idx))
+    # Reading "a" makes it the most recently used, even though it was written first
+    assert cache.get("a")
+    cache.max_disk_bytes = cache.disk_bytes - 1
+    cache.prune()
+    assert sorted(f.stem for f in tmp_path.glob("*.json")) == ["a", "c"]
+    assert cache.disk_bytes == sum(f.stat().st_size for f in tmp_path.glob("*.json"))
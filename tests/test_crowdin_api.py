@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+from aiohttp import ClientConnectionError
+
+from common.crowdin_api import CrowdinAPI, CrowdinError
+
+
+class FakeResponse:
+    def __init__(self, status: int, data: dict, headers: dict = None):
+        self.status = status
+        self.data = data
+        self.headers = headers or {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def json(self, content_type=None):
+        return self.data
+
+
+class FakeSession:
+    closed = False
+
+    def __init__(self, responses: list):
+        self.responses = responses
+        self.calls = []
+
+    def request(self, method, url, params=None, json=None):
+        self.calls.append(dict(params or {}))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def client_with(responses: list, retries: int = 0) -> CrowdinAPI:
+    client = CrowdinAPI("key", retries=retries)
+    client.session = FakeSession(responses)
+    return client
+
+
+def page(start: int, count: int) -> FakeResponse:
+    return FakeResponse(200, {"data": [{"data": {"id": i}} for i in range(start, start + count)]})
+
+
+def test_paginate_fetches_every_page():
+    client = client_with([page(0, 500), page(500, 3)])
+    items = asyncio.run(client.paginate("url"))
+    assert [i["id"] for i in items] == list(range(503))
+    assert [call["offset"] for call in client.session.calls] == [0, 500]
+
+
+def test_paginate_stops_on_empty_page():
+    client = client_with([page(0, 500), page(500, 0)])
+    assert len(asyncio.run(client.paginate("url"))) == 500
+
+
+def test_paginate_raises_instead_of_returning_part_of_a_listing():
+    client = client_with([page(0, 500), FakeResponse(503, {"error": "unavailable"})])
+    with pytest.raises(CrowdinError):
+        asyncio.run(client.paginate("url"))
+
+
+def test_server_errors_count_as_congestion():
+    client = client_with([FakeResponse(503, {})])
+    client.limiter.limit = 8
+    asyncio.run(client.request("GET", "url"))
+    assert client.limiter.limit == 4
+
+
+def test_connection_errors_count_as_congestion():
+    client = client_with([ClientConnectionError()])
+    client.limiter.limit = 8
+    with pytest.raises(ClientConnectionError):
+        asyncio.run(client.request("GET", "url"))
+    assert client.limiter.limit == 4
+
+
+def test_success_grows_the_limit():
+    client = client_with([page(0, 1)])
+    client.limiter.limit = 8
+    asyncio.run(client.request("GET", "url"))
+    assert client.limiter.limit > 8
+
+
+def test_exhausted_quota_pauses_even_on_success():
+    headers = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "30"}
+    client = client_with([FakeResponse(200, {"data": []}, headers)])
+    status, _ = asyncio.run(client.request("GET", "url"))
+    assert status == 200
+    assert client.limiter.paused_until > 0
+
+
+def test_throttled_requests_are_retried():
+    client = client_with([FakeResponse(429, {}, {"Retry-After": "0"}), page(0, 1)], retries=2)
+    status, data = asyncio.run(client.request("POST", "url"))
+    assert status == 200
+    assert len(client.session.calls) == 2
@@ -0,0 +1,89 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from common import daemon
+from common.models import StringRecord
+
+
+class FakeRequest:
+    def __init__(self, body: str, headers: dict = None):
+        self.body = body
+        self.headers = headers or {}
+
+    async def json(self):
+        return json.loads(self.body)
+
+
+@pytest.fixture
+def watcher(tmp_path, monkeypatch):
+    processed = tmp_path / "processed.json"
+    processed.write_text("[]")
+    monkeypatch.setattr(daemon, "processed_json", processed)
+    monkeypatch.setattr(daemon, "WEBHOOK_SECRET", "s3cret")
+    return daemon.Watcher(client=None)
+
+
+def post(watcher, body, secret="s3cret") -> int:
+    request = FakeRequest(body, {daemon.SECRET_HEADER: secret})
+    return asyncio.run(watcher.handle_webhook(request)).status
+
+
+def test_string_events_mark_projects_dirty(watcher):
+    body = json.dumps(
+        {
+            "events": [
+                {"event": "string.added", "string": {"project": {"id": "12"}}},
+                {"event": "file.updated", "file": {"projectId": 34}},
+                {"event": "translation.updated", "projectId": 56},
+            ]
+        }
+    )
+    assert post(watcher, body) == 200
+    assert watcher.dirty == {12, 34}
+    assert watcher.wake.is_set()
+
+
+def test_wrong_secret_is_rejected(watcher):
+    body = json.dumps({"event": "string.added", "projectId": 1})
+    assert post(watcher, body, secret="nope") == 401
+    assert post(watcher, body, secret="") == 401
+    assert watcher.dirty == set()
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        "not json",
+        json.dumps(["string.added"]),
+        json.dumps({"events": "string.added"}),
+        json.dumps({"events": ["string.added"]}),
+        json.dumps({"event": "string.added", "projectId": "abc"}),
+        json.dumps({"event": "string.added", "projectId": [1]}),
+    ],
+)
+def test_malformed_payloads_are_bad_requests(watcher, body):
+    assert post(watcher, body) == 400
+    assert watcher.dirty == set()
+
+
+class FakeClient:
+    def __init__(self, strings):
+        self.strings = strings
+
+    async def get_strings(self, project_id):
+        return self.strings
+
+
+def test_scan_skips_plural_strings(watcher):
+    strings = [
+        StringRecord({"id": 1, "projectId": 1, "text": "Hello", "revision": 1}),
+        StringRecord({"id": 2, "projectId": 1, "text": {"one": "file", "other": "files"}}),
+    ]
+    watcher.client = FakeClient(strings)
+    languages = [SimpleNamespace(id="de"), SimpleNamespace(id="fr")]
+    project = SimpleNamespace(id=1, name="Example", targetLanguages=languages)
+    asyncio.run(watcher.scan(project))
+    assert sorted(watcher.queued) == ["1-1-de", "1-1-fr"]
@@ -0,0 +1,36 @@
+import json
+
+from common import estimate
+
+
+def test_history_defaults(tmp_path, monkeypatch):
+    path = tmp_path / "history.json"
+    path.write_text(json.dumps(dict.fromkeys(("strings", "source", "calls", "completion", "seconds"), 0)))
+    monkeypatch.setattr(estimate, "history_json", path)
+    assert estimate.history() == (
+        estimate.CALLS_PER_STRING,
+        estimate.COMPLETION_RATIO,
+        estimate.SECONDS_PER_TOKEN,
+        estimate.CROWDIN_SECONDS_PER_STRING,
+    )
+
+
+def test_history_rates(tmp_path, monkeypatch):
+    path = tmp_path / "history.json"
+    stats = {
+        "strings": 10,
+        "source": 100,
+        "calls": 15,
+        "completion": 200,
+        "timed_completion": 150,
+        "seconds": 3,
+        "crowdin_seconds": 5,
+    }
+    path.write_text(json.dumps(stats))
+    monkeypatch.setattr(estimate, "history_json", path)
+    assert estimate.history() == (1.5, 2, 0.02, 0.5)
+
+
+def test_format_duration():
+    assert estimate.format_duration(65) == "1m05s"
+    assert estimate.format_duration(3725) == "1h02m"
@@ -0,0 +1,70 @@
+import json
+
+from common.glossary import Automaton, TermIndex
+
+
+def test_overlapping_patterns():
+    automaton = Automaton(["he", "she", "his", "hers", "he said"])
+    assert automaton.search("she said his hers") == {"she", "his", "hers"}
+    assert automaton.search("he said") == {"he", "he said"}
+
+
+def test_substrings_dont_match():
+    automaton = Automaton(["log", "in"])
+    assert automaton.search("logging into the catalog") == set()
+    assert automaton.search("log in, then log-out") == {"log", "in"}
+
+
+def test_case_folding():
+    automaton = Automaton(["Dashboard", "Straße"])
+    assert automaton.search("open the DASHBOARD") == {"Dashboard"}
+    assert automaton.search("STRASSE") == {"Straße"}
+
+
+def test_folded_length_changes():
+    # "İ" lowercases to two characters, the match must still start at the right place
+    automaton = Automaton(["İstanbul", "ß"])
+    assert automaton.search("visit istanbul today") == set()
+    assert automaton.search("visit İstanbul today") == {"İstanbul"}
+    assert automaton.search("a ß b") == {"ß"}
+    assert automaton.search("aß") == set()
+
+
+def test_fail_links_after_partial_match():
+    # "abd" fails after "ab", the matcher has to fall back and still find "bc"
+    automaton = Automaton(["abd", "bc"])
+    assert automaton.search("abc") == set()
+    assert automaton.search("a bc") == {"bc"}
+
+
+def test_lookup_language_fallback():
+    index = TermIndex()
+    index.add("Dashboard", {"pt": "Painel", "de": "Übersicht"})
+    index.add("Settings", {"pt-BR": "Configurações"})
+    assert index.lookup("Open Settings from the dashboard", "pt-BR") == [
+        ("Dashboard", "Painel"),
+        ("Settings", "Configurações"),
+    ]
+    assert index.lookup("Open Settings from the dashboard", "de") == [("Dashboard", "Übersicht")]
+    assert index.lookup("Nothing here", "de") == []
+
+
+def test_lookup_rebuilds_after_add():
+    index = TermIndex()
+    index.add("Dashboard", {"de": "Übersicht"})
+    assert index.lookup("Settings", "de") == []
+    index.add("Settings", {"de": "Einstellungen"})
+    assert index.lookup("Settings", "de") == [("Settings", "Einstellungen")]
+
+
+def test_load_file(tmp_path):
+    csv_path = tmp_path / "glossary.csv"
+    csv_path.write_text("term,de,fr\nDashboard,Übersicht,\nLog in,Anmelden,Connexion\n", encoding="utf-8")
+    json_path = tmp_path / "glossary.json"
+    json_path.write_text(json.dumps({"Settings": {"fr": "Paramètres"}}), encoding="utf-8")
+    index = TermIndex()
+    index.load_file(csv_path)
+    index.load_file(json_path)
+    assert len(index) == 3
+    assert index.lookup("Log in to the dashboard", "fr") == [("Log in", "Connexion")]
+    assert index.lookup("Settings", "fr") == [("Settings", "Paramètres")]
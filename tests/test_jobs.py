@@ -0,0 +1,17 @@
+import json
+
+from common.jobs import ProcessedKeys
+
+
+def test_processed_keys(tmp_path):
+    path = tmp_path / "processed.json"
+    path.write_text(json.dumps(["1-2-de"]))
+    processed = ProcessedKeys(path)
+    assert "1-2-de" in processed
+    assert "1-3-de" not in processed
+    processed.add("1-3-de")
+    processed.add("1-3-de")
+    assert "1-3-de" in processed
+    assert len(processed) == 2
+    assert json.loads(path.read_text()) == ["1-2-de", "1-3-de"]
+    assert "1-3-de" in ProcessedKeys(path)
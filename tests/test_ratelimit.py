@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+import pytest
+
+from common.ratelimit import AdaptiveLimiter, backoff, retry_after
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_limit_grows_on_success():
+    async def main():
+        limiter = AdaptiveLimiter(initial=2, maximum=3)
+        for _ in range(10):
+            await limiter.acquire()
+            await limiter.release()
+        return limiter.limit
+
+    assert run(main()) == 3
+
+
+def test_limit_halves_once_per_congestion_event():
+    async def main():
+        limiter = AdaptiveLimiter(initial=8)
+        for _ in range(4):
+            await limiter.acquire()
+        # Requests that were in flight together only halve the limit once
+        for _ in range(4):
+            await limiter.release(congested=True)
+        return limiter.limit, limiter.in_flight
+
+    assert run(main()) == (4, 0)
+
+
+def test_limit_never_drops_below_minimum():
+    async def main():
+        limiter = AdaptiveLimiter(initial=1, minimum=1)
+        await limiter.acquire()
+        await limiter.release(congested=True)
+        return limiter.limit
+
+    assert run(main()) == 1
+
+
+def test_acquire_waits_for_a_free_slot():
+    async def main():
+        limiter = AdaptiveLimiter(initial=1)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        blocked = not waiter.done()
+        await limiter.release()
+        await asyncio.wait_for(waiter, 1)
+        return blocked
+
+    assert run(main())
+
+
+def test_pause_delays_acquire():
+    async def main():
+        limiter = AdaptiveLimiter()
+        limiter.pause(0.05)
+        start = time.monotonic()
+        await limiter.acquire()
+        return time.monotonic() - start
+
+    assert run(main()) >= 0.04
+
+
+def test_backoff_is_capped():
+    assert all(0 <= backoff(attempt, cap=5) <= 5 for attempt in range(20))
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ({}, None),
+        ({"Retry-After": "3"}, 3),
+        ({"Retry-After": "soon"}, None),
+        ({"X-RateLimit-Remaining": "5", "X-RateLimit-Reset": "10"}, None),
+        ({"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "10"}, 10),
+        ({"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "x"}, None),
+    ],
+)
+def test_retry_after(headers, expected):
+    assert retry_after(headers) == expected
+
+
+def test_retry_after_reset_timestamp():
+    headers = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(time.time() + 30)}
+    assert 28 < retry_after(headers) <= 30
+    headers["X-RateLimit-Reset"] = str(time.time() - 30)
+    assert retry_after(headers) == 0
@@ -0,0 +1,98 @@
+import sqlite3
+
+from common.sharding import CLAIM_LEASE, CoordinationStore, shard_of
+
+
+def test_shard_of_is_stable():
+    assert shard_of(123, "de", 4) == shard_of(123, "de", 4)
+    assert {shard_of(i, "de", 4) for i in range(100)} == {0, 1, 2, 3}
+
+
+def test_claim_is_exclusive(tmp_path):
+    path = tmp_path / "coordination.sqlite3"
+    first = CoordinationStore(path, 0)
+    second = CoordinationStore(path, 1)
+    assert first.claim("1-2-de")
+    assert not second.claim("1-2-de")
+    # Claiming again from the same shard is fine, ex: resuming after a crash
+    assert first.claim("1-2-de")
+
+
+def test_expired_lease_can_be_taken_over(tmp_path):
+    path = tmp_path / "coordination.sqlite3"
+    first = CoordinationStore(path, 0)
+    second = CoordinationStore(path, 1)
+    assert first.claim("1-2-de")
+    first.db.execute("UPDATE jobs SET updated = updated - ?", (CLAIM_LEASE + 1,))
+    assert second.claim("1-2-de")
+
+
+def test_done_jobs_are_not_claimed_again(tmp_path):
+    path = tmp_path / "coordination.sqlite3"
+    first = CoordinationStore(path, 0)
+    second = CoordinationStore(path, 1)
+    assert first.claim("1-2-de", revision=1)
+    first.finish("1-2-de", True)
+    assert not second.claim("1-2-de", revision=1)
+    assert not second.claim("1-2-de")
+    assert first.done_keys() == {"1-2-de"}
+
+
+def test_new_revision_is_reclaimed(tmp_path):
+    path = tmp_path / "coordination.sqlite3"
+    first = CoordinationStore(path, 0)
+    second = CoordinationStore(path, 1)
+    assert first.claim("1-2-de", revision=1)
+    first.finish("1-2-de", True)
+    assert second.claim("1-2-de", revision=2)
+    assert not first.claim("1-2-de", revision=2)
+
+
+def test_failed_and_released_jobs_can_be_claimed(tmp_path):
+    path = tmp_path / "coordination.sqlite3"
+    first = CoordinationStore(path, 0)
+    second = CoordinationStore(path, 1)
+    assert first.claim("1-2-de")
+    first.finish("1-2-de", False)
+    assert second.claim("1-2-de")
+    second.release("1-2-de")
+    assert first.claim("1-2-de")
+    assert second.done_keys() == set()
+
+
+def test_release_keeps_finished_jobs(tmp_path):
+    store = CoordinationStore(tmp_path / "coordination.sqlite3", 0)
+    assert store.claim("1-2-de")
+    store.finish("1-2-de", True)
+    store.release("1-2-de")
+    assert store.done_keys() == {"1-2-de"}
+
+
+def test_finish_only_touches_own_claims(tmp_path):
+    path = tmp_path / "coordination.sqlite3"
+    first = CoordinationStore(path, 0)
+    second = CoordinationStore(path, 1)
+    assert first.claim("1-2-de")
+    second.finish("1-2-de", True)
+    assert first.done_keys() == set()
+
+
+def test_old_stores_gain_the_revision_column(tmp_path):
+    path = tmp_path / "coordination.sqlite3"
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE jobs (key TEXT PRIMARY KEY, shard INTEGER, status TEXT, updated REAL)")
+    db.execute("INSERT INTO jobs VALUES ('1-2-de', 0, 'done', 0)")
+    db.commit()
+    db.close()
+    store = CoordinationStore(path, 1)
+    assert not store.claim("1-2-de")
+    assert store.claim("1-2-de", revision=3)
+
+
+def test_usage_is_summed_across_shards(tmp_path):
+    path = tmp_path / "coordination.sqlite3"
+    usage = {"total_tokens": 30, "prompt_tokens": 20, "completion_tokens": 10}
+    CoordinationStore(path, 0).add_usage(usage)
+    CoordinationStore(path, 0).add_usage(usage)
+    CoordinationStore(path, 1).add_usage(usage)
+    assert CoordinationStore(path, -1).total_usage() == {"total": 90, "prompt": 60, "completion": 30}
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from common.streaming import StreamValidator, consume_stream
+
+RUSSIAN = "Привет, как у тебя сегодня дела? Надеюсь, всё хорошо!"
+ENGLISH = "Hello, how are you doing today? I hope everything is fine!"
+
+
+@pytest.mark.parametrize(
+    "source, reply, reason",
+    [
+        ("Hello {name}", "Hallo {name} {", "placeholder"),
+        ("Run `help`", "Führe `help` aus`", "backtick"),
+        ("Hi", "x" * 50, "length"),
+        ("Hello {name}", "Hallo {name}", None),
+    ],
+)
+def test_check(source, reply, reason):
+    assert StreamValidator(source).check(reply) == reason
+
+
+def test_wrong_script_is_cancelled():
+    validator = StreamValidator(ENGLISH, "ru")
+    assert validator.check(ENGLISH) == "script"
+    assert validator.check(RUSSIAN) is None
+
+
+def test_short_replies_are_not_judged():
+    validator = StreamValidator(ENGLISH, "ru")
+    assert validator.check("Hello, how") is None
+
+
+def test_placeholders_dont_count_as_letters():
+    validator = StreamValidator(ENGLISH, "ru")
+    untranslated = "{" + "x" * 200 + "} `" + "y" * 200 + "`"
+    assert validator.script_ok(RUSSIAN + untranslated)
+    assert not validator.script_ok(RUSSIAN + "x" * 200)
+
+
+def test_sources_without_letters_skip_the_script_check():
+    validator = StreamValidator("{user}: {count} `{prefix}help`", "ru")
+    assert validator.scripts is None
+
+
+def test_unknown_languages_skip_the_script_check():
+    assert StreamValidator(ENGLISH, "xx").check(RUSSIAN) is None
+
+
+class FakeStream:
+    def __init__(self, chunks: list):
+        self.chunks = chunks
+        self.sent = 0
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.sent >= len(self.chunks):
+            raise StopAsyncIteration
+        self.sent += 1
+        return self.chunks[self.sent - 1]
+
+    async def aclose(self):
+        self.closed = True
+
+
+def chunk(**delta) -> dict:
+    return {"choices": [{"delta": delta}]}
+
+
+def test_consume_stream_builds_content():
+    stream = FakeStream([{"choices": []}, chunk(role="assistant"), chunk(content="Hal"), chunk(content="lo")])
+    message, reason = asyncio.run(consume_stream(stream, StreamValidator("Hello")))
+    assert message == {"role": "assistant", "content": "Hallo"}
+    assert reason is None
+    assert stream.closed
+
+
+def test_consume_stream_builds_function_calls():
+    stream = FakeStream(
+        [
+            chunk(role="assistant", content=None, function_call={"name": "get_translation", "arguments": ""}),
+            chunk(function_call={"arguments": '{"message": '}),
+            chunk(function_call={"arguments": '"Hello"}'}),
+        ]
+    )
+    message, reason = asyncio.run(consume_stream(stream, StreamValidator("Hello")))
+    assert message["content"] is None
+    assert message["function_call"] == {"name": "get_translation", "arguments": '{"message": "Hello"}'}
+    assert reason is None
+
+
+def test_consume_stream_stops_early():
+    stream = FakeStream([chunk(content="Hallo {"), chunk(content="name}"), chunk(content="!")])
+    message, reason = asyncio.run(consume_stream(stream, StreamValidator("Hello")))
+    assert reason == "placeholder"
+    assert message["content"] == "Hallo {"
+    assert stream.sent == 1
+    assert stream.closed
+
+
+def test_consume_stream_validates_unescaped_newlines():
+    # "\\n" becomes a single newline before uploading, so it mustn't count towards the length
+    stream = FakeStream([chunk(content=r"a\n" * 14)])
+    message, reason = asyncio.run(consume_stream(stream, StreamValidator("")))
+    assert reason is None